@@ -3,31 +3,150 @@
 
 import numpy as np
 
+from interpret_personas.jit import njit, parallel_kernel, prange
+
+# Budget for one (n_responses, chunk) column block: a typical 1 MiB L2. Narrower
+# blocks than _MIN_CHUNK columns cost more in loop overhead than they save.
+_BLOCK_BYTES = 1024 * 1024
+_MIN_CHUNK = 4096
+
+
+def _feature_chunk_size(n_rows: int, itemsize: int) -> int:
+    """Number of feature columns per cache-resident block of an (n_rows, F) array."""
+    chunk = _BLOCK_BYTES // max(n_rows * itemsize, 1)
+    return max(_MIN_CHUNK, chunk - chunk % 64)
+
+
+if njit is not None:
+
+    @parallel_kernel
+    def _fused_mean_max(features, mean_out, max_out, block_size):
+        """Column-wise mean and max of a C-contiguous 2D array in a single pass."""
+        n_rows, n_cols = features.shape
+        if n_rows == 0:
+            raise ValueError("Cannot aggregate zero responses")
+        n_blocks = (n_cols + block_size - 1) // block_size
+        for block in prange(n_blocks):
+            start = block * block_size
+            end = min(start + block_size, n_cols)
+            width = end - start
+            sums = np.zeros(width, dtype=np.float32)
+            maxes = features[0, start:end].copy()
+            # Row-major walk over the block keeps reads contiguous and lets the
+            # inner loop vectorize
+            for i in range(n_rows):
+                row = features[i, start:end]
+                for k in range(width):
+                    value = row[k]
+                    sums[k] += value
+                    if value > maxes[k] or value != value:
+                        maxes[k] = value
+            for k in range(width):
+                mean_out[start + k] = sums[k] / n_rows
+                max_out[start + k] = maxes[k]
+
+    # float16 -> float32 decode table indexed by the raw bits (256 KiB, stays in L2);
+    # Numba has no CPU float16 type, so kernels read float16 arrays as uint16
+    _FLOAT16_TO_FLOAT32 = np.arange(1 << 16, dtype=np.uint16).view(np.float16).astype(np.float32)
+
+    @parallel_kernel
+    def _float16_mean(bits, table, inv_rows, out, block_size):
+        """Column-wise mean of a float16 array given as uint16 bits, one column block per task."""
+        n_rows, n_cols = bits.shape
+        n_blocks = (n_cols + block_size - 1) // block_size
+        for block in prange(n_blocks):
+            start = block * block_size
+            end = min(start + block_size, n_cols)
+            sums = np.zeros(end - start, dtype=np.float32)
+            # Same row-order float32 accumulation as np.add.reduce(axis=0, dtype=float32)
+            for i in range(n_rows):
+                for k in range(end - start):
+                    sums[k] += table[bits[i, start + k]]
+            for k in range(end - start):
+                out[start + k] = sums[k] * inv_rows
+
+    @parallel_kernel
+    def _float16_max(bits, table, out, block_size):
+        """Column-wise max of a float16 array given as uint16 bits (NaN propagates like np.max)."""
+        n_rows, n_cols = bits.shape
+        n_blocks = (n_cols + block_size - 1) // block_size
+        for block in prange(n_blocks):
+            start = block * block_size
+            end = min(start + block_size, n_cols)
+            maxes = np.full(end - start, -np.inf, dtype=np.float32)
+            for i in range(n_rows):
+                for k in range(end - start):
+                    value = table[bits[i, start + k]]
+                    if value > maxes[k] or value != value:
+                        maxes[k] = value
+            for k in range(end - start):
+                out[start + k] = maxes[k]
+
+else:
+    _fused_mean_max = None
+    _float16_mean = None
+    _float16_max = None
+
 
 def aggregate_mean(features: np.ndarray) -> np.ndarray:
     """
     Mean pooling across axis 0.
 
+    Uses a contiguous float32 np.add.reduce plus one scalar multiply, so float16
+    response features stay accurate and no temporary is allocated. With Numba,
+    float16 input is reduced by a cache-blocked kernel instead, with identical
+    results (NumPy's float16 casting loop is several times slower).
+
     Args:
         features: Array to aggregate
 
     Returns:
-        Mean-pooled vector
+        Mean-pooled float32 vector
     """
-    return np.mean(features, axis=0)
+    features = np.ascontiguousarray(features)
+    if features.shape[0] == 0:
+        raise ValueError("Cannot aggregate zero responses")
+    if _float16_mean is not None and features.dtype == np.float16:
+        mean_out = np.empty(features.shape[1], dtype=np.float32)
+        _float16_mean(
+            features.view(np.uint16),
+            _FLOAT16_TO_FLOAT32,
+            np.float32(1.0 / features.shape[0]),
+            mean_out,
+            _feature_chunk_size(features.shape[0], features.itemsize),
+        )
+        return mean_out
+    return np.multiply(
+        np.add.reduce(features, axis=0, dtype=np.float32),
+        1.0 / features.shape[0],
+        dtype=np.float32,
+    )
 
 
 def aggregate_max(features: np.ndarray) -> np.ndarray:
     """
     Max pooling across axis 0.
 
+    With Numba, float16 input is reduced by a cache-blocked kernel (see
+    aggregate_mean); results are identical.
+
     Args:
         features: Array to aggregate
 
     Returns:
-        Max-pooled vector
+        Max-pooled float32 vector
     """
-    return np.max(features, axis=0)
+    if _float16_max is not None and features.dtype == np.float16 and features.shape[0] > 0:
+        features = np.ascontiguousarray(features)
+        max_out = np.empty(features.shape[1], dtype=np.float32)
+        _float16_max(
+            features.view(np.uint16),
+            _FLOAT16_TO_FLOAT32,
+            max_out,
+            _feature_chunk_size(features.shape[0], features.itemsize),
+        )
+        return max_out
+    return np.max(features, axis=0).astype(np.float32, copy=False)
 
 
 AGGREGATION_FUNCTIONS = {
@@ -36,23 +155,52 @@ AGGREGATION_FUNCTIONS = {
 }
 
 
-def aggregate_role(response_features: list[np.ndarray]) -> dict[str, np.ndarray]:
+def aggregate_role(response_features: np.ndarray | list[np.ndarray]) -> dict[str, np.ndarray]:
     """
     Aggregate all responses for a role.
 
-    Applies all aggregation strategies (mean, max) across responses.
+    Applies every strategy in AGGREGATION_FUNCTIONS across responses: mean and
+    max share one fused pass, any other strategy runs on the same buffer. Reductions
+    always run on a C-contiguous float32 (n_responses, n_features) buffer; callers
+    that already hold one (e.g. a preallocated array or a row slice of it) avoid
+    any copy, anything else is converted once on entry.
 
     Args:
-        response_features: List of (n_features,) vectors from individual responses
+        response_features: (n_responses, n_features) array, or a list of
+            (n_features,) vectors from individual responses
 
     Returns:
-        Dict mapping strategy name to role-level vector
+        Dict mapping strategy name to float32 role-level vector
         Example: {"mean": role_vector, "max": role_vector}
     """
-    # Stack response vectors
-    stacked = np.array(response_features)  # Shape: (n_responses, n_features)
-
-    return {
-        name: func(stacked)
-        for name, func in AGGREGATION_FUNCTIONS.items()
-    }
+    if len(response_features) == 0:
+        raise ValueError("Cannot aggregate zero responses")
+    if isinstance(response_features, np.ndarray):
+        stacked = np.ascontiguousarray(response_features, dtype=np.float32)
+    else:
+        # Copy response vectors into one float32 (n_responses, n_features) buffer
+        n_responses = len(response_features)
+        stacked = np.empty((n_responses, response_features[0].shape[0]), dtype=np.float32)
+        for i, vector in enumerate(response_features):
+            stacked[i] = vector
+
+    n_responses, n_features = stacked.shape
+    mean_out = np.empty(n_features, dtype=np.float32)
+    max_out = np.empty(n_features, dtype=np.float32)
+    chunk = _feature_chunk_size(n_responses, stacked.itemsize)
+    if _fused_mean_max is not None:
+        _fused_mean_max(stacked, mean_out, max_out, chunk)
+    else:
+        # Reduce one L2-sized column block at a time so mean and max reuse it
+        for start in range(0, n_features, chunk):
+            end = min(start + chunk, n_features)
+            block = stacked[:, start:end]
+            np.add.reduce(block, axis=0, out=mean_out[start:end])
+            np.maximum.reduce(block, axis=0, out=max_out[start:end])
+        mean_out *= 1.0 / n_responses
+
+    aggregated = {"mean": mean_out, "max": max_out}
+    for strategy_name, func in AGGREGATION_FUNCTIONS.items():
+        if strategy_name not in aggregated:
+            aggregated[strategy_name] = func(stacked)
+    return aggregated
@@ -19,6 +19,19 @@ class GenerationConfig:
     question_mode: str = "general"  # "general" or "role_specific"
     max_model_len: int = 2048
     gpu_memory_utilization: float = 0.95
+    tensor_parallel_size: int = 1
+    enable_prefix_caching: bool = True
+    enforce_eager: bool = False
+    max_num_seqs: int | None = None  # None keeps vLLM's default
+    max_num_batched_tokens: int | None = None  # None keeps vLLM's default
+    block_size: int | None = None  # None keeps vLLM's default
+    enable_chunked_prefill: bool | None = None  # None keeps vLLM's default
+    cudagraph_capture_sizes: list[int] | None = None  # None keeps vLLM's default sizes
+    roles_per_batch: int = 8
+    sort_prompts_by_length: bool = True
+    # Generate identical conversations once and share the response. Opt-in: roles
+    # rendering the same conversation get copies instead of independent samples
+    dedup_prompts: bool = False
     temperature: float = 0.7
     top_p: float = 0.9
     max_tokens: int = 512
@@ -66,6 +79,30 @@ class GenerationConfig:
             raise ValueError(
                 f"gpu_memory_utilization must be in (0, 1]: {self.gpu_memory_utilization}"
             )
+        if self.tensor_parallel_size <= 0:
+            raise ValueError(f"tensor_parallel_size must be positive: {self.tensor_parallel_size}")
+        # Allowed block sizes (8, 16, 32, ...) depend on the vLLM version and attention
+        # backend, so vLLM itself validates the exact value
+        if self.block_size is not None and self.block_size <= 0:
+            raise ValueError(f"block_size must be positive: {self.block_size}")
+        if self.max_num_seqs is not None and self.max_num_seqs <= 0:
+            raise ValueError(f"max_num_seqs must be positive: {self.max_num_seqs}")
+        if self.max_num_batched_tokens is not None and self.max_num_batched_tokens <= 0:
+            raise ValueError(
+                f"max_num_batched_tokens must be positive: {self.max_num_batched_tokens}"
+            )
+        if self.cudagraph_capture_sizes is not None:
+            if self.enforce_eager:
+                raise ValueError("cudagraph_capture_sizes requires enforce_eager=false")
+            if not self.cudagraph_capture_sizes or any(
+                size <= 0 for size in self.cudagraph_capture_sizes
+            ):
+                raise ValueError(
+                    f"cudagraph_capture_sizes must be non-empty and positive: "
+                    f"{self.cudagraph_capture_sizes}"
+                )
+        if self.roles_per_batch <= 0:
+            raise ValueError(f"roles_per_batch must be positive: {self.roles_per_batch}")
         if not 0 <= self.temperature <= 2:
             raise ValueError(f"temperature must be in [0, 2]: {self.temperature}")
         if not 0 < self.top_p <= 1:
@@ -101,6 +138,12 @@ class ExtractionConfig:
     responses_dir: Path
     output_dir: Path
     token_selection: str = "response_only"
+    sae_dtype: str = "bfloat16"
+    compile_sae: bool = False
+    batch_size: int = 8  # Conversations per padded forward pass
+    feature_cache_dir: Path | None = None
+    feature_dtype: str = "float16"  # "float16" or "int8" (per-row scaled)
+    compress_features: bool = True  # False writes uncompressed .npz (no zlib deflate on save/load)
 
     @classmethod
     def from_yaml(cls, path: Path) -> "ExtractionConfig":
@@ -111,6 +154,9 @@ class ExtractionConfig:
         data["responses_dir"] = Path(data["responses_dir"])
         data["output_dir"] = Path(data["output_dir"])
 
+        if data.get("feature_cache_dir"):
+            data["feature_cache_dir"] = Path(data["feature_cache_dir"]).expanduser()
+
         return cls(**data)
 
     def validate(self):
@@ -124,6 +170,16 @@ class ExtractionConfig:
             raise ValueError(
                 f"token_selection must be 'response_only' or 'all': {self.token_selection}"
             )
+        if self.sae_dtype not in ["float32", "bfloat16", "float16"]:
+            raise ValueError(
+                f"sae_dtype must be 'float32', 'bfloat16' or 'float16': {self.sae_dtype}"
+            )
+        if self.batch_size <= 0:
+            raise ValueError(f"batch_size must be positive: {self.batch_size}")
+        if self.feature_dtype not in ["float16", "int8"]:
+            raise ValueError(
+                f"feature_dtype must be 'float16' or 'int8': {self.feature_dtype}"
+            )
 
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
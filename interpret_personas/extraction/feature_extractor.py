@@ -1,14 +1,64 @@
 """SAE feature extraction with token selection support."""
 
+import hashlib
 import logging
+import os
 import re
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
+from pathlib import Path
+from typing import NamedTuple
 
 import numpy as np
 import torch
 
 logger = logging.getLogger(__name__)
 
+# Max distinct prompts whose token length is remembered per extractor
+_PROMPT_CACHE_SIZE = 4096
+
+# Max rendered prompt-only chat templates remembered per extractor
+_RENDER_CACHE_SIZE = 8192
+
+# Part of every on-disk feature cache key; bump when tokenization, pooling or the
+# stored arrays change so entries written by older code are never reused
+_FEATURE_CACHE_VERSION = 1
+
+# Tokens SAE-encoded at once; bounds the (chunk, n_features) activation buffer
+_ENCODE_CHUNK_TOKENS = 1024
+
+# Packed token counts are padded to a multiple of this when the SAE encode is
+# compiled, so graphs are reused across batches instead of recompiled per shape
+_COMPILE_TOKEN_BUCKET = 256
+
+# Layer index in SAE hook names (e.g. 'blocks.40.hook_resid_post')
+_LAYER_RE = re.compile(r"(?:blocks|layers)\.(\d+)\.")
+
+# Chat templates with this block can return an assistant-token mask directly
+_GENERATION_BLOCK_RE = re.compile(r"\{%-?\s*generation\s*-?%\}")
+
+
+class _PreparedBatch(NamedTuple):
+    """CPU-side output of FeatureExtractor._prepare_batch."""
+
+    n_rows: int
+    input_ids: torch.Tensor | None  # Right-padded uncached rows; None if all rows hit the cache
+    attention_mask: torch.Tensor | None
+    miss_rows: list[int]  # Batch rows that need a forward pass, in input_ids order
+    response_starts: list[int]  # Per miss row
+    seq_lens: list[int]  # Per miss row
+    cache_keys: list[str] | None  # Per batch row; None when the feature cache is off
+    cached: dict[int, tuple[np.ndarray, np.ndarray]]  # Batch row -> cached (mean, max)
+
+
+def _parse_layer_index(hook_name: str) -> int:
+    """Extract layer index from SAE hook name (e.g. 'blocks.40.hook_resid_post' -> 40)."""
+    match = _LAYER_RE.search(hook_name)
+    if not match:
+        raise ValueError(f"Cannot parse layer index from hook name: {hook_name}")
+    return int(match.group(1))
+
 
 def _gather_acts_hook(module, input, output, cache, key):
     """Store layer output activations in cache dict."""
@@ -25,7 +75,7 @@ def _get_decoder_layer(model, layer_idx):
     return inner.layers[layer_idx]
 
 
-def _gather_residual_activations(model, target_layer, inputs):
+def _gather_residual_activations(model, target_layer, inputs, attention_mask=None):
     """Run forward pass and capture residual stream at target_layer via hook."""
     cache = {}
     handle = _get_decoder_layer(model, target_layer).register_forward_hook(
@@ -33,7 +83,7 @@ def _gather_residual_activations(model, target_layer, inputs):
     )
     try:
         with torch.no_grad():
-            model(inputs)
+            model(inputs, attention_mask=attention_mask)
     finally:
         handle.remove()
     return cache["resid_post"]
@@ -48,20 +98,58 @@ class FeatureExtractor:
     - "all": Extract features from all tokens in the conversation
     """
 
-    def __init__(self, model, sae, tokenizer):
+    def __init__(
+        self,
+        model,
+        sae,
+        tokenizer,
+        compile_sae: bool = False,
+        cache_dir: Path | None = None,
+    ):
         self.model = model
         self.sae = sae
         self.tokenizer = tokenizer
         self.device = "cuda"
-        self._target_layer = self._parse_layer_index(sae.cfg.metadata.hook_name)
+        self.compile_sae = compile_sae
+        self._encode = (
+            torch.compile(sae.encode, mode="reduce-overhead", dynamic=False)
+            if compile_sae
+            else sae.encode
+        )
+        self._target_layer = _parse_layer_index(sae.cfg.metadata.hook_name)
+        # LRU of prompt-only token lengths keyed by ((role, content), ...)
+        self._prompt_len_cache: OrderedDict[tuple[tuple[str, str], ...], int] = OrderedDict()
+        # LRU of rendered prompt-only templates, same keys; lives and dies with the extractor
+        self._render_cache: OrderedDict[tuple[tuple[str, str], ...], str] = OrderedDict()
+        chat_template = getattr(tokenizer, "chat_template", None)
+        self._supports_assistant_mask = isinstance(chat_template, str) and bool(
+            _GENERATION_BLOCK_RE.search(chat_template)
+        )
 
-    @staticmethod
-    def _parse_layer_index(hook_name: str) -> int:
-        """Extract layer index from SAE hook name (e.g. 'blocks.40.hook_resid_post' -> 40)."""
-        match = re.search(r"(?:blocks|layers)\.(\d+)\.", hook_name)
-        if not match:
-            raise ValueError(f"Cannot parse layer index from hook name: {hook_name}")
-        return int(match.group(1))
+        # On-disk (mean, max) cache keyed by cache version, model checkpoint, tokenizer,
+        # SAE and token ids; a hit skips the transformer forward for that conversation
+        self.cache_dir = Path(cache_dir).expanduser() if cache_dir is not None else None
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        metadata = sae.cfg.metadata
+        model_config = getattr(model, "config", None)
+        self._cache_namespace = "|".join(
+            str(part)
+            for part in (
+                _FEATURE_CACHE_VERSION,
+                # Checkpoints sharing a tokenizer path (fine-tunes, re-downloads) must not
+                # share entries; the commit hash is set for Hub snapshots
+                getattr(model_config, "_name_or_path", ""),
+                getattr(model_config, "_commit_hash", ""),
+                getattr(tokenizer, "name_or_path", ""),
+                getattr(metadata, "release", ""),
+                getattr(metadata, "sae_id", ""),
+                metadata.hook_name,
+                sae.dtype,
+            )
+        ).encode()
+        self.cache_hits = 0
+        self.cache_misses = 0
 
     def extract_from_conversation(
         self,
@@ -78,71 +166,397 @@ class FeatureExtractor:
         Returns:
             Dict with "mean" and "max" aggregated feature vectors of shape (n_features,)
         """
-        if token_selection not in ["response_only", "all"]:
-            raise ValueError(f"token_selection must be 'response_only' or 'all', got {token_selection}")
+        batch = self.extract_batch([conversation], token_selection)
+        return {"mean": batch["mean"][0], "max": batch["max"][0]}
+
+    def _tokenize_conversations(
+        self,
+        conversations: list[list[dict[str, str]]],
+        token_selection: str,
+    ) -> tuple[list[list[int]], list[int | None]]:
+        """
+        Tokenize full conversations and locate where each assistant response starts.
+
+        If the chat template marks assistant turns with a generation block, a single
+        render returns both the tokens and the assistant mask. Otherwise the response
+        start falls back to the (cached) prompt-only token length.
+        """
+        if self._supports_assistant_mask:
+            encoded = self.tokenizer.apply_chat_template(
+                conversations,
+                tokenize=True,
+                add_generation_prompt=False,
+                return_dict=True,
+                return_assistant_tokens_mask=True,
+            )
+            starts = []
+            for mask in encoded["assistant_masks"]:
+                mask = np.asarray(mask)
+                starts.append(int(np.argmax(mask)) if mask.any() else None)
+            if all(start is not None for start in starts) or token_selection == "all":
+                return [list(ids) for ids in encoded["input_ids"]], starts
+            # Template did not mark this response; fall through to the prompt path.
+
+        formatted_texts = [
+            self.tokenizer.apply_chat_template(
+                conversation,
+                tokenize=False,
+                add_generation_prompt=False,
+            )
+            for conversation in conversations
+        ]
+        input_ids = self.tokenizer(formatted_texts, add_special_tokens=False)["input_ids"]
+        if token_selection == "all":
+            return input_ids, [0] * len(conversations)
+        return input_ids, self._find_response_starts(conversations)
+
+    def _find_response_start(
+        self,
+        conversation: list[dict[str, str]],
+    ) -> int | None:
+        """Find the token index where the assistant response starts."""
+        return self._find_response_starts([conversation])[0]
+
+    def _find_response_starts(
+        self,
+        conversations: list[list[dict[str, str]]],
+    ) -> list[int | None]:
+        """
+        Find response start indices for a batch of conversations.
+
+        Prompt-only token lengths are cached, so only prompts not seen before are
+        rendered and tokenized (in a single batched call).
+        """
+        starts: list[int | None] = [None] * len(conversations)
+        misses: dict[tuple[tuple[str, str], ...], list[int]] = {}
+
+        for row, conversation in enumerate(conversations):
+            if conversation[-1]["role"] != "assistant":
+                logger.warning("No assistant message at end of conversation")
+                continue
+            key = tuple((message["role"], message["content"]) for message in conversation[:-1])
+            cached = self._prompt_len_cache.get(key)
+            if cached is None:
+                misses.setdefault(key, []).append(row)
+            else:
+                self._prompt_len_cache.move_to_end(key)
+                starts[row] = cached
+
+        if misses:
+            prompt_texts = [
+                self._render_prompt(key) for key in misses
+            ]
+            # Only lengths are needed: no padding, no tensors, nothing on the device
+            prompt_lens = self.tokenizer(
+                prompt_texts,
+                add_special_tokens=False,
+                return_length=True,
+            )["length"]
+            for (key, rows), prompt_len in zip(misses.items(), prompt_lens):
+                for row in rows:
+                    starts[row] = prompt_len
+                self._prompt_len_cache[key] = prompt_len
+            while len(self._prompt_len_cache) > _PROMPT_CACHE_SIZE:
+                self._prompt_len_cache.popitem(last=False)
 
-        formatted_text = self.tokenizer.apply_chat_template(
-            conversation,
+        return starts
+
+    def _render_prompt(self, conversation: tuple[tuple[str, str], ...]) -> str:
+        """Render a (role, content) prompt tuple with a generation prompt, via the LRU."""
+        rendered = self._render_cache.get(conversation)
+        if rendered is not None:
+            self._render_cache.move_to_end(conversation)
+            return rendered
+        rendered = self.tokenizer.apply_chat_template(
+            [{"role": role, "content": content} for role, content in conversation],
             tokenize=False,
-            add_generation_prompt=False,
+            add_generation_prompt=True,
         )
+        self._render_cache[conversation] = rendered
+        while len(self._render_cache) > _RENDER_CACHE_SIZE:
+            self._render_cache.popitem(last=False)
+        return rendered
 
-        tokens = self.tokenizer.encode(formatted_text, return_tensors="pt", add_special_tokens=False).to(self.device)
-        if tokens.dim() == 1:
-            tokens = tokens.unsqueeze(0)
+    def _cache_key(self, input_ids: list[int], response_start: int) -> str:
+        """Hash the cache namespace and the pooled token range into a cache file key."""
+        digest = hashlib.blake2b(self._cache_namespace, digest_size=16)
+        digest.update(np.int64(response_start).tobytes())
+        digest.update(np.asarray(input_ids, dtype=np.int64).tobytes())
+        return digest.hexdigest()
 
-        activations = _gather_residual_activations(self.model, self._target_layer, tokens)
-        sae_features = self.sae.encode(activations.to(self.sae.dtype).to(self.sae.device))
+    def _cache_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.npz"
 
-        features = sae_features.squeeze(0).detach().cpu().numpy()
+    def _load_cached(self, key: str) -> tuple[np.ndarray, np.ndarray] | None:
+        """Load cached (mean, max) vectors, or None on a miss or unreadable entry."""
+        path = self._cache_path(key)
+        if not path.exists():
+            return None
+        try:
+            with np.load(path) as data:
+                return data["mean"], data["max"]
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable feature cache entry {path}: {e}")
+            return None
+
+    def _save_cached(self, key: str, mean: np.ndarray, max_: np.ndarray) -> None:
+        """Write (mean, max) vectors atomically so readers never see partial files."""
+        path = self._cache_path(key)
+        path.parent.mkdir(exist_ok=True)
+        tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npz")
+        np.savez_compressed(tmp_path, mean=mean, max=max_)
+        os.replace(tmp_path, path)
+
+    def _prepare_batch(
+        self,
+        conversations: list[list[dict[str, str]]],
+        token_selection: str,
+    ) -> _PreparedBatch:
+        """
+        CPU-side batch preparation: render, tokenize, look up the feature cache and
+        right-pad the conversations that still need a forward pass.
+
+        The padded tensors are pinned when CUDA is available so the host-to-device
+        copy can be async.
+        """
+        input_ids, response_starts = self._tokenize_conversations(conversations, token_selection)
 
         if token_selection == "response_only":
-            response_start_idx = self._find_response_start(conversation)
-            if response_start_idx is not None:
-                features = features[response_start_idx:]
-            else:
+            if any(start is None for start in response_starts):
                 logger.warning("Could not find response start, using all tokens")
+            response_starts = [start or 0 for start in response_starts]
+        else:
+            response_starts = [0] * len(conversations)
 
-        return {
-            "mean": np.mean(features, axis=0),
-            "max": np.max(features, axis=0),
-        }
+        cache_keys = None
+        cached = {}
+        if self.cache_dir is not None:
+            cache_keys = [
+                self._cache_key(ids, start) for ids, start in zip(input_ids, response_starts)
+            ]
+            for row, key in enumerate(cache_keys):
+                hit = self._load_cached(key)
+                if hit is not None:
+                    cached[row] = hit
 
-    def _find_response_start(
-        self,
-        conversation: list[dict[str, str]],
-    ) -> int:
-        """Find the token index where the assistant response starts."""
-        if conversation[-1]["role"] != "assistant":
-            logger.warning("No assistant message at end of conversation")
-            return None
+        miss_rows = [row for row in range(len(conversations)) if row not in cached]
+        if not miss_rows:
+            return _PreparedBatch(len(conversations), None, None, [], [], [], cache_keys, cached)
 
-        prompt_only = conversation[:-1]
+        seq_lens = [len(input_ids[row]) for row in miss_rows]
+        pad_token_id = self.tokenizer.pad_token_id or 0
+        batch_ids = torch.full((len(miss_rows), max(seq_lens)), pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros_like(batch_ids)
+        for i, row in enumerate(miss_rows):
+            batch_ids[i, : seq_lens[i]] = torch.tensor(input_ids[row], dtype=torch.long)
+            attention_mask[i, : seq_lens[i]] = 1
 
-        prompt_text = self.tokenizer.apply_chat_template(
-            prompt_only,
-            tokenize=False,
-            add_generation_prompt=True,
+        if torch.cuda.is_available():
+            batch_ids = batch_ids.pin_memory()
+            attention_mask = attention_mask.pin_memory()
+        return _PreparedBatch(
+            len(conversations),
+            batch_ids,
+            attention_mask,
+            miss_rows,
+            [response_starts[row] for row in miss_rows],
+            seq_lens,
+            cache_keys,
+            cached,
+        )
+
+    def _run_batch(self, prepared: _PreparedBatch) -> dict[str, np.ndarray]:
+        """GPU-side forward, SAE encode and pooling for a prepared batch."""
+        features = self._empty_features(prepared.n_rows)
+        for row, (mean, max_) in prepared.cached.items():
+            features["mean"][row] = mean
+            features["max"][row] = max_
+        self.cache_hits += len(prepared.cached)
+        if not prepared.miss_rows:
+            return features
+        self.cache_misses += len(prepared.miss_rows)
+
+        activations = _gather_residual_activations(
+            self.model,
+            self._target_layer,
+            prepared.input_ids.to(self.device, non_blocking=True),
+            attention_mask=prepared.attention_mask.to(self.device, non_blocking=True),
         )
 
-        prompt_tokens = self.tokenizer.encode(prompt_text, return_tensors="pt", add_special_tokens=False).to(self.device)
-        if prompt_tokens.dim() == 1:
-            prompt_tokens = prompt_tokens.unsqueeze(0)
+        with torch.no_grad():
+            # Pack the kept tokens of every row back to back for the SAE
+            segments = list(zip(prepared.response_starts, prepared.seq_lens))
+            kept = torch.cat([activations[row, start:end] for row, (start, end) in enumerate(segments)])
+            mean_mat, max_mat = self._encode_and_pool(
+                kept.to(self.sae.dtype).to(self.sae.device),
+                [end - start for start, end in segments],
+            )
 
-        return prompt_tokens.shape[1]
+        features["mean"][prepared.miss_rows] = mean_mat
+        features["max"][prepared.miss_rows] = max_mat
+        if prepared.cache_keys is not None:
+            for row in prepared.miss_rows:
+                self._save_cached(
+                    prepared.cache_keys[row], features["mean"][row], features["max"][row]
+                )
+        return features
+
+    def _encode_and_pool(
+        self,
+        activations: torch.Tensor,
+        segment_lens: list[int],
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        SAE-encode packed token segments and mean/max pool each segment on-device.
+
+        The encode streams over chunks of _ENCODE_CHUNK_TOKENS tokens and folds each
+        chunk into running per-segment sums and maxima, so the full
+        (n_tokens, n_features) activation matrix is never materialized. SAE
+        activations are overwhelmingly zero and never negative, so only nonzero
+        entries are scattered (into zero-initialized maxima). Reductions accumulate
+        in float32 and only the (n_segments, n_features) results reach the host.
+
+        Args:
+            activations: (sum(segment_lens), d_model) activations, segments back to back
+            segment_lens: Number of tokens in each segment
+
+        Returns:
+            (mean, max) arrays of shape (n_segments, n_features)
+        """
+        n_segments = len(segment_lens)
+        n_features = self.sae.cfg.d_sae
+        device = activations.device
+        lengths = torch.tensor(segment_lens, device=device)
+        segment_ids = torch.repeat_interleave(torch.arange(n_segments, device=device), lengths)
+
+        sums = torch.zeros(n_segments * n_features, dtype=torch.float32, device=device)
+        maxes = torch.zeros(n_segments * n_features, dtype=torch.float32, device=device)
+        for start in range(0, activations.shape[0], _ENCODE_CHUNK_TOKENS):
+            sae_features = self._encode_packed(activations[start : start + _ENCODE_CHUNK_TOKENS])
+            token_idx, feature_idx = sae_features.nonzero(as_tuple=True)
+            values = sae_features[token_idx, feature_idx].float()
+            if values.numel() and bool(values.min() < 0):
+                # Not a non-negative SAE: zero-initialized maxima would be wrong.
+                return self._encode_and_pool_dense(activations, segment_ids, n_segments)
+            flat_idx = segment_ids[start + token_idx] * n_features + feature_idx
+            sums.index_add_(0, flat_idx, values)
+            maxes.scatter_reduce_(0, flat_idx, values, reduce="amax")
+
+        mean_mat = sums.view(n_segments, n_features) / lengths.unsqueeze(1)
+        max_mat = maxes.view(n_segments, n_features)
+        return mean_mat.cpu().numpy(), max_mat.cpu().numpy()
+
+    def _encode_and_pool_dense(
+        self,
+        activations: torch.Tensor,
+        segment_ids: torch.Tensor,
+        n_segments: int,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Dense chunked fallback of _encode_and_pool for SAEs with signed outputs."""
+        n_features = self.sae.cfg.d_sae
+        device = activations.device
+        sums = torch.zeros((n_segments, n_features), dtype=torch.float32, device=device)
+        maxes = torch.full((n_segments, n_features), -torch.inf, dtype=torch.float32, device=device)
+        for start in range(0, activations.shape[0], _ENCODE_CHUNK_TOKENS):
+            sae_features = self._encode_packed(activations[start : start + _ENCODE_CHUNK_TOKENS]).float()
+            chunk_ids = segment_ids[start : start + sae_features.shape[0]]
+            sums.index_add_(0, chunk_ids, sae_features)
+            maxes.scatter_reduce_(
+                0, chunk_ids.unsqueeze(1).expand_as(sae_features), sae_features, reduce="amax"
+            )
+
+        lengths = torch.bincount(segment_ids, minlength=n_segments)
+        mean_mat = sums / lengths.unsqueeze(1)
+        return mean_mat.cpu().numpy(), maxes.cpu().numpy()
+
+    def _encode_packed(self, activations: torch.Tensor) -> torch.Tensor:
+        """SAE-encode packed (n_tokens, d_model) activations."""
+        if not self.compile_sae:
+            return self._encode(activations)
+
+        n_tokens = activations.shape[0]
+        padded_len = -(-n_tokens // _COMPILE_TOKEN_BUCKET) * _COMPILE_TOKEN_BUCKET
+        padded = torch.nn.functional.pad(activations, (0, 0, 0, padded_len - n_tokens))
+        # Clone: CUDA-graph outputs are overwritten by the next replay
+        return self._encode(padded)[:n_tokens].clone()
 
     def extract_batch(
         self,
         conversations: list[list[dict[str, str]]],
         token_selection: str = "response_only",
-    ) -> list[dict[str, np.ndarray]]:
+    ) -> dict[str, np.ndarray]:
+        """
+        Extract features from a batch of conversations with one padded forward pass.
+
+        Sequences are right-padded so every row keeps its real tokens at positions
+        [0, seq_len); padding never reaches the SAE or the pooled vectors.
+
+        Args:
+            conversations: List of conversations (each is a list of message dicts)
+            token_selection: "response_only" or "all"
+
+        Returns:
+            Dict with "mean" and "max" arrays of shape (n_conversations, n_features)
+        """
+        if token_selection not in ["response_only", "all"]:
+            raise ValueError(f"token_selection must be 'response_only' or 'all', got {token_selection}")
+        if not conversations:
+            return self._empty_features(0)
+
+        return self._run_batch(self._prepare_batch(conversations, token_selection))
+
+    def extract_from_conversations(
+        self,
+        conversations: list[list[dict[str, str]]],
+        token_selection: str = "response_only",
+        batch_size: int = 8,
+    ) -> dict[str, np.ndarray]:
         """
-        Extract features from a batch of conversations.
+        Extract features from many conversations in padded batches.
+
+        Tokenization of batch i+1 runs on a background thread while the GPU
+        processes batch i, keeping the tokenizer off the critical path.
 
-        Note: Processes one at a time (no batching) to handle variable-length responses.
+        Args:
+            conversations: List of conversations (each is a list of message dicts)
+            token_selection: "response_only" or "all"
+            batch_size: Conversations per forward pass
+
+        Returns:
+            Dict with "mean" and "max" arrays of shape (n_conversations, n_features),
+            preallocated and filled batch by batch
         """
-        features_list = []
-        for conversation in conversations:
-            features = self.extract_from_conversation(conversation, token_selection)
-            features_list.append(features)
-        return features_list
+        if token_selection not in ["response_only", "all"]:
+            raise ValueError(f"token_selection must be 'response_only' or 'all', got {token_selection}")
+        if batch_size <= 0:
+            raise ValueError(f"batch_size must be positive, got {batch_size}")
+
+        batches = [
+            conversations[start : start + batch_size]
+            for start in range(0, len(conversations), batch_size)
+        ]
+        features = self._empty_features(len(conversations))
+        if not batches:
+            return features
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            pending = pool.submit(self._prepare_batch, batches[0], token_selection)
+            for start, next_batch in zip(
+                range(0, len(conversations), batch_size), batches[1:] + [None]
+            ):
+                prepared = pending.result()
+                if next_batch is not None:
+                    pending = pool.submit(self._prepare_batch, next_batch, token_selection)
+                batch = self._run_batch(prepared)
+                end = start + batch["mean"].shape[0]
+                features["mean"][start:end] = batch["mean"]
+                features["max"][start:end] = batch["max"]
+        return features
+
+    def _empty_features(self, n_rows: int) -> dict[str, np.ndarray]:
+        """Allocate uninitialized (n_rows, n_features) float32 mean/max outputs."""
+        n_features = self.sae.cfg.d_sae
+        return {
+            "mean": np.empty((n_rows, n_features), dtype=np.float32),
+            "max": np.empty((n_rows, n_features), dtype=np.float32),
+        }
@@ -13,6 +13,7 @@ def load_sae_model(
     model_name: str,
     sae_release: str,
     sae_id: str,
+    sae_dtype: str = "bfloat16",
 ) -> tuple:
     """
     Load HuggingFace model and SAE for feature extraction.
@@ -21,24 +22,30 @@ def load_sae_model(
         model_name: HuggingFace model name
         sae_release: SAE release name (e.g., "gemma-scope-2-27b-it-res")
         sae_id: SAE ID (e.g., "layer_40_width_65k_l0_medium")
+        sae_dtype: dtype for SAE weights and encode (e.g., "bfloat16", "float32")
 
     Returns:
         Tuple of (model, sae, tokenizer)
     """
     logger.info(f"Loading {model_name}...")
+    # Stream bf16 weights straight into their device_map placement instead of
+    # materializing a full fp32 copy on the host first
     model = AutoModelForCausalLM.from_pretrained(
         model_name,
         dtype=torch.bfloat16,
         device_map="auto",
+        low_cpu_mem_usage=True,
     )
+    model.eval()
 
     tokenizer = AutoTokenizer.from_pretrained(model_name)
 
-    logger.info(f"Loading SAE: {sae_release}/{sae_id}")
+    logger.info(f"Loading SAE: {sae_release}/{sae_id} ({sae_dtype})")
     sae = SAE.from_pretrained(
         release=sae_release,
         sae_id=sae_id,
         device="cuda",
+        dtype=sae_dtype,
     )
 
     logger.info("Model and SAE loaded successfully")
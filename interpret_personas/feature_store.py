@@ -0,0 +1,251 @@
+"""Storage helpers for per-role response features produced by stage 2."""
+
+import logging
+import os
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Per-row dequantization scales for int8 arrays are stored under "{key}_scale"
+SCALE_SUFFIX = "_scale"
+
+
+def role_npy_path(features_dir: Path, role_name: str, key: str) -> Path:
+    """Path of the uncompressed copy of one feature array (e.g. {role}.mean_features.npy)."""
+    return features_dir / f"{role_name}.{key}.npy"
+
+
+def quantize_int8(features: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Symmetrically quantize each row to int8 with its own scale (max |x| / 127).
+
+    Args:
+        features: [n_responses, sae_dim] array
+
+    Returns:
+        Tuple of (int8 values, float32 per-row scales); all-zero rows get scale 0
+    """
+    values = np.asarray(features, dtype=np.float32)
+    scales = np.abs(values).max(axis=1) / 127.0
+    quantized = np.divide(
+        values,
+        scales[:, None],
+        out=np.zeros_like(values),
+        where=scales[:, None] > 0,
+    )
+    return np.rint(quantized).astype(np.int8), scales.astype(np.float32)
+
+
+def dequantize_int8(values: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """Invert quantize_int8, returning float32."""
+    return values.astype(np.float32) * scales[:, None]
+
+
+def save_role_features(
+    npz_file: Path,
+    arrays: dict[str, np.ndarray],
+    feature_dtype: str = "float16",
+    compress: bool = True,
+) -> Path:
+    """
+    Write one role's feature arrays to an .npz, quantizing first for int8 storage.
+
+    The archive is written under a temporary name and renamed into place, so an
+    interrupted save never leaves a truncated .npz for --skip-existing to accept.
+    Module-level so stage 2 can run it in a worker process.
+
+    Args:
+        npz_file: Destination .npz path
+        arrays: Array name -> [n_responses, sae_dim] float array
+        feature_dtype: "float16", or "int8" to store per-row scaled int8 plus "{key}_scale"
+        compress: zlib-compress the archive (np.savez_compressed)
+
+    Returns:
+        npz_file
+    """
+    if feature_dtype == "int8":
+        quantized = {}
+        for key, values in arrays.items():
+            quantized[key], quantized[key + SCALE_SUFFIX] = quantize_int8(values)
+        arrays = quantized
+
+    save_npz = np.savez_compressed if compress else np.savez
+    tmp_file = npz_file.with_name(f"{npz_file.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_file, "wb") as f:
+            save_npz(f, **arrays)
+        os.replace(tmp_file, npz_file)
+    finally:
+        tmp_file.unlink(missing_ok=True)
+    return npz_file
+
+
+def load_role_features(
+    features_dir: Path,
+    role_name: str,
+    key: str,
+    mmap: bool = True,
+) -> np.ndarray:
+    """
+    Load one role's [n_responses, sae_dim] feature array.
+
+    Uncompressed .npy copies (see migrate_npz_to_npy) are preferred and
+    memory-mapped, so no zlib inflate is paid. Copies older than the role's
+    .npz are ignored as stale. int8-quantized arrays are dequantized to float32.
+
+    Args:
+        features_dir: Stage 2 output directory
+        role_name: Role name (file stem)
+        key: Array name, e.g. "mean_features"
+        mmap: Memory-map .npy copies read-only instead of reading them into RAM
+
+    Returns:
+        Feature array in its stored dtype (float32 for int8-quantized arrays)
+    """
+    arrays = load_role_feature_arrays(features_dir, role_name, [key], mmap=mmap)
+    if key not in arrays:
+        raise KeyError(f"Missing key '{key}' in {features_dir / f'{role_name}.npz'}")
+    return arrays[key]
+
+
+def load_role_feature_arrays(
+    features_dir: Path,
+    role_name: str,
+    keys: list[str],
+    mmap: bool = True,
+) -> dict[str, np.ndarray]:
+    """
+    Load several of one role's feature arrays, opening its .npz at most once.
+
+    Follows the same .npy preference and int8 dequantization as load_role_features.
+
+    Args:
+        features_dir: Stage 2 output directory
+        role_name: Role name (file stem)
+        keys: Array names, e.g. ["mean_features", "max_features"]
+        mmap: Memory-map .npy copies read-only instead of reading them into RAM
+
+    Returns:
+        Dict of key -> array; keys missing from the role's files are omitted
+    """
+    role_file = features_dir / f"{role_name}.npz"
+    role_mtime = role_file.stat().st_mtime if role_file.exists() else None
+
+    arrays = {}
+    npz_keys = []
+    for key in keys:
+        npy_file = role_npy_path(features_dir, role_name, key)
+        if npy_file.exists() and (role_mtime is None or npy_file.stat().st_mtime >= role_mtime):
+            values = np.load(npy_file, mmap_mode="r" if mmap else None)
+            if values.dtype == np.int8:
+                scales = np.load(role_npy_path(features_dir, role_name, key + SCALE_SUFFIX))
+                values = dequantize_int8(values, scales)
+            arrays[key] = values
+        else:
+            npz_keys.append(key)
+
+    if not npz_keys:
+        return arrays
+    if role_mtime is None:
+        raise FileNotFoundError(f"Missing role feature file: {role_file}")
+
+    with np.load(role_file) as role_npz:
+        for key in npz_keys:
+            if key not in role_npz:
+                continue
+            values = role_npz[key]
+            if values.dtype == np.int8:
+                values = dequantize_int8(values, role_npz[key + SCALE_SUFFIX])
+            arrays[key] = values
+    return arrays
+
+
+def _load_role_feature_arrays_as(
+    features_dir: Path,
+    role_name: str,
+    keys: list[str],
+    dtype: np.dtype | None,
+) -> dict[str, np.ndarray]:
+    """load_role_feature_arrays, optionally cast to dtype (on the loader thread)."""
+    arrays = load_role_feature_arrays(features_dir, role_name, keys)
+    if dtype is not None:
+        arrays = {key: values.astype(dtype, copy=False) for key, values in arrays.items()}
+    return arrays
+
+
+def iter_role_feature_arrays(
+    features_dir: Path,
+    role_names: list[str],
+    keys: list[str],
+    max_workers: int = 4,
+    dtype: np.dtype | None = None,
+) -> Iterator[tuple[str, dict[str, np.ndarray]]]:
+    """
+    Yield (role_name, arrays) in order while later roles load on worker threads.
+
+    zlib inflate and file reads release the GIL, so loading overlaps with
+    whatever the caller does with the current role. At most 2 * max_workers
+    roles are in flight, which bounds memory.
+
+    Args:
+        features_dir: Stage 2 output directory
+        role_names: Roles to load, in yield order
+        keys: Array names passed to load_role_feature_arrays
+        max_workers: Loader threads
+        dtype: Cast every array to this dtype on the loader thread (None keeps stored dtypes)
+
+    Yields:
+        (role_name, dict of key -> array) as from load_role_feature_arrays
+    """
+    window = 2 * max_workers
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending: deque = deque()
+        for role_name in role_names:
+            pending.append((
+                role_name,
+                pool.submit(_load_role_feature_arrays_as, features_dir, role_name, keys, dtype),
+            ))
+            if len(pending) >= window:
+                name, future = pending.popleft()
+                yield name, future.result()
+        while pending:
+            name, future = pending.popleft()
+            yield name, future.result()
+
+
+def migrate_npz_to_npy(features_dir: Path, overwrite: bool = False) -> int:
+    """
+    Write an uncompressed .npy copy of every array in every role .npz.
+
+    The .npz files are kept, so stage 3 and the notebooks are unaffected.
+
+    Args:
+        features_dir: Stage 2 output directory
+        overwrite: Rewrite copies that are already up to date
+
+    Returns:
+        Number of .npy files written
+    """
+    written = 0
+    for role_file in sorted(features_dir.glob("*.npz")):
+        with np.load(role_file) as role_npz:
+            for key in role_npz.files:
+                npy_file = role_npy_path(features_dir, role_file.stem, key)
+                if (
+                    not overwrite
+                    and npy_file.exists()
+                    and npy_file.stat().st_mtime >= role_file.stat().st_mtime
+                ):
+                    continue
+                tmp_file = npy_file.with_name(npy_file.name + ".tmp")
+                with open(tmp_file, "wb") as f:
+                    np.save(f, role_npz[key])
+                os.replace(tmp_file, npy_file)
+                written += 1
+        logger.info(f"Migrated {role_file.name}")
+    return written
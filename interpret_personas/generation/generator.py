@@ -1,9 +1,18 @@
 """vLLM-based response generation."""
 
 import logging
+from collections import OrderedDict
+
+from interpret_personas.generation.data_loader import RoleData
 
 logger = logging.getLogger(__name__)
 
+# Stand-in for the final user message when rendering a reusable prompt template
+_QUESTION_PLACEHOLDER = "<<interpret-personas-question>>"
+
+# Max generated responses remembered for reuse by later identical conversations
+_RESPONSE_CACHE_SIZE = 65536
+
 
 class VLLMGenerator:
     """
@@ -15,6 +24,7 @@ class VLLMGenerator:
         config = GenerationConfig.from_yaml("configs/generation.yaml")
         generator = VLLMGenerator(config)
         results = generator.generate_for_role(instructions, questions, prompt_indices)
+        results_by_role = generator.generate_for_roles(roles)
     """
 
     def __init__(self, config):
@@ -30,11 +40,29 @@ class VLLMGenerator:
 
         logger.info(f"Loading vLLM model: {config.model_name}")
 
+        # Scheduler/KV-cache knobs left as None keep vLLM's own defaults
+        optional_engine_args = {
+            "max_num_seqs": config.max_num_seqs,
+            "max_num_batched_tokens": config.max_num_batched_tokens,
+            "block_size": config.block_size,
+            "enable_chunked_prefill": config.enable_chunked_prefill,
+        }
+        if config.cudagraph_capture_sizes is not None:
+            # Decode batches are padded up to the nearest captured size; vLLM
+            # captures every listed size once while the engine starts
+            optional_engine_args["compilation_config"] = {
+                "cudagraph_capture_sizes": sorted(set(config.cudagraph_capture_sizes)),
+            }
+
         self.llm = LLM(
             model=config.model_name,
             max_model_len=config.max_model_len,
             gpu_memory_utilization=config.gpu_memory_utilization,
+            tensor_parallel_size=config.tensor_parallel_size,
+            enable_prefix_caching=config.enable_prefix_caching,
+            enforce_eager=config.enforce_eager,
             trust_remote_code=True,
+            **{key: value for key, value in optional_engine_args.items() if value is not None},
         )
 
         self.sampling_params = SamplingParams(
@@ -43,6 +71,13 @@ class VLLMGenerator:
             max_tokens=config.max_tokens,
         )
 
+        # Rendered (prefix, suffix) around the final user message, keyed by the
+        # preceding messages; None where splicing does not reproduce the template
+        self._template_cache: dict[tuple[tuple[str, str], ...], tuple[str, str] | None] = {}
+        self._warm_prefix_params = SamplingParams(max_tokens=1)
+        # LRU of generated responses keyed by the conversation's (role, content) pairs
+        self._response_cache: OrderedDict[tuple[tuple[str, str], ...], str] = OrderedDict()
+
         logger.info("Model loaded successfully")
 
     def generate_batch(
@@ -59,21 +94,164 @@ class VLLMGenerator:
             List of generated response texts
         """
         tokenizer = self.llm.get_tokenizer()
+        prompts = [self._render_prompt(tokenizer, conv) for conv in conversations]
 
-        prompts = []
-        for conv in conversations:
-            prompt = tokenizer.apply_chat_template(
-                conv,
+        if self.config.enable_prefix_caching:
+            self._warm_prefix_cache(tokenizer, conversations)
+
+        token_prompts = self._tokenize_prompts(tokenizer, prompts)
+        order = list(range(len(token_prompts)))
+        if self.config.sort_prompts_by_length:
+            order = self._longest_first_order(conversations, token_prompts)
+
+        logger.info(f"Running batch inference for {len(prompts)} prompts...")
+        outputs = self.llm.generate([token_prompts[i] for i in order], self.sampling_params)
+
+        responses = [""] * len(outputs)
+        for prompt_idx, output in zip(order, outputs):
+            responses[prompt_idx] = output.outputs[0].text
+        return responses
+
+    @staticmethod
+    def _longest_first_order(
+        conversations: list[list[dict[str, str]]],
+        token_prompts: list[dict[str, list[int]]],
+    ) -> list[int]:
+        """
+        Submission order that puts long prompts first without splitting prefix groups.
+
+        Prompts sharing everything but the final user message (i.e. the same
+        instruction) stay contiguous so they hit the prefix cache together. Groups
+        are ordered by their longest prompt and sorted longest first within, so
+        long prompts don't trail the batch.
+        """
+        lengths = [len(prompt["prompt_token_ids"]) for prompt in token_prompts]
+        groups: dict[tuple[tuple[str, str], ...], list[int]] = {}
+        for idx, conv in enumerate(conversations):
+            key = tuple((message["role"], message["content"]) for message in conv[:-1])
+            groups.setdefault(key, []).append(idx)
+
+        group_rows = sorted(
+            groups.values(), key=lambda rows: max(lengths[i] for i in rows), reverse=True
+        )
+        order = []
+        for rows in group_rows:
+            order.extend(sorted(rows, key=lengths.__getitem__, reverse=True))
+        return order
+
+    def _generate_unique(self, conversations: list[list[dict[str, str]]]) -> list[str]:
+        """
+        Generate responses, submitting each distinct conversation only once.
+
+        Roles that share an instruction produce byte-identical prompts. With
+        config.dedup_prompts, duplicates within the call and conversations already
+        generated earlier in the run reuse that response instead of being sampled
+        again. Otherwise this is generate_batch.
+        """
+        if not self.config.dedup_prompts:
+            return self.generate_batch(conversations)
+
+        keys = [
+            tuple((message["role"], message["content"]) for message in conv)
+            for conv in conversations
+        ]
+        misses: dict[tuple[tuple[str, str], ...], list[dict[str, str]]] = {}
+        for key, conv in zip(keys, conversations):
+            if key not in self._response_cache and key not in misses:
+                misses[key] = conv
+
+        if len(misses) < len(conversations):
+            logger.info(
+                f"Reusing responses for {len(conversations) - len(misses)} "
+                f"of {len(conversations)} duplicate prompts"
+            )
+        if misses:
+            for key, response in zip(misses, self.generate_batch(list(misses.values()))):
+                self._response_cache[key] = response
+
+        responses = []
+        for key in keys:
+            self._response_cache.move_to_end(key)
+            responses.append(self._response_cache[key])
+        while len(self._response_cache) > _RESPONSE_CACHE_SIZE:
+            self._response_cache.popitem(last=False)
+        return responses
+
+    def _render_prompt(self, tokenizer, conversation: list[dict[str, str]]) -> str:
+        """
+        Render a conversation with the chat template, reusing a cached render for
+        conversations that differ only in the final user message.
+
+        Every (system prompt, question) pair shares its template up to the question,
+        so the Jinja render runs once per distinct prefix and questions are spliced
+        in. The first splice per prefix is checked against a full render, and
+        templates that transform user content (e.g. trimming) fall back to full
+        rendering.
+        """
+
+        def render(messages):
+            return tokenizer.apply_chat_template(
+                messages,
                 tokenize=False,
                 add_generation_prompt=True,
             )
-            prompts.append(prompt)
 
-        logger.info(f"Running batch inference for {len(prompts)} prompts...")
-        outputs = self.llm.generate(prompts, self.sampling_params)
+        question = conversation[-1]["content"]
+        if (
+            conversation[-1]["role"] != "user"
+            or question != question.strip()
+            or _QUESTION_PLACEHOLDER in question
+        ):
+            return render(conversation)
+
+        key = tuple((message["role"], message["content"]) for message in conversation[:-1])
+        if key not in self._template_cache:
+            template = render(conversation[:-1] + [{"role": "user", "content": _QUESTION_PLACEHOLDER}])
+            parts = template.split(_QUESTION_PLACEHOLDER)
+            prompt = render(conversation)
+            spliced = parts[0] + question + parts[1] if len(parts) == 2 else None
+            self._template_cache[key] = (parts[0], parts[1]) if spliced == prompt else None
+            return prompt
+
+        cached = self._template_cache[key]
+        if cached is None:
+            return render(conversation)
+        prefix, suffix = cached
+        return prefix + question + suffix
+
+    @staticmethod
+    def _tokenize_prompts(tokenizer, prompts: list[str]) -> list[dict[str, list[int]]]:
+        """
+        Tokenize rendered prompts in one batched call and wrap them as vLLM token prompts.
 
-        responses = [output.outputs[0].text for output in outputs]
-        return responses
+        The chat template already emits BOS, so no special tokens are added; this
+        matches how the extraction stage tokenizes the same rendered text.
+        """
+        token_ids = tokenizer(prompts, add_special_tokens=False)["input_ids"]
+        return [{"prompt_token_ids": ids} for ids in token_ids]
+
+    def _warm_prefix_cache(self, tokenizer, conversations: list[list[dict[str, str]]]) -> None:
+        """
+        Prefill each shared prompt prefix once so the batch reuses its cached KV blocks.
+
+        Without this, prompts scheduled in the same step all miss the prefix cache
+        and recompute the system prompt.
+        """
+        prefix_counts: dict[str, int] = {}
+        for conv in conversations:
+            key = tuple((message["role"], message["content"]) for message in conv[:-1])
+            cached = self._template_cache.get(key)
+            if cached is not None:
+                prefix_counts[cached[0]] = prefix_counts.get(cached[0], 0) + 1
+
+        shared_prefixes = [prefix for prefix, count in prefix_counts.items() if count > 1]
+        if shared_prefixes:
+            logger.info(f"Warming prefix cache with {len(shared_prefixes)} shared prompt prefixes")
+            self.llm.generate(
+                self._tokenize_prompts(tokenizer, shared_prefixes),
+                self._warm_prefix_params,
+                use_tqdm=False,
+            )
 
     def generate_for_role(
         self,
@@ -92,10 +270,71 @@ class VLLMGenerator:
         Returns:
             List of result dicts with response, system_prompt, question_id, etc.
         """
+        conversations, metadata = self._build_conversations(instructions, questions, prompt_indices)
+        if not conversations:
+            return []
+
+        responses = self._generate_unique(conversations)
+        return self._build_results(conversations, metadata, responses)
+
+    def generate_for_roles(
+        self,
+        roles: list[RoleData],
+        prompt_indices: list[int] | None = None,
+    ) -> dict[str, list[dict]]:
+        """
+        Generate responses for several roles with a single vLLM generate call.
+
+        One large submission keeps the scheduler's batch full instead of draining
+        it at every role boundary. Questions follow config.question_mode.
+
+        Args:
+            roles: Roles to generate for
+            prompt_indices: Which instruction indices to use (default: config.prompt_indices)
+
+        Returns:
+            Dict mapping role name to its list of result dicts (as generate_for_role)
+        """
+        all_conversations = []
+        all_metadata = []
+        role_counts = []
+        for role_data in roles:
+            questions = (
+                role_data.general_questions
+                if self.config.question_mode == "general"
+                else role_data.role_questions
+            )
+            conversations, metadata = self._build_conversations(
+                role_data.instructions, questions, prompt_indices
+            )
+            all_conversations.extend(conversations)
+            all_metadata.extend(metadata)
+            role_counts.append((role_data.name, len(conversations)))
+
+        responses = self._generate_unique(all_conversations) if all_conversations else []
+
+        results_by_role = {}
+        offset = 0
+        for role_name, count in role_counts:
+            end = offset + count
+            results_by_role[role_name] = self._build_results(
+                all_conversations[offset:end], all_metadata[offset:end], responses[offset:end]
+            )
+            offset = end
+        return results_by_role
+
+    def _build_conversations(
+        self,
+        instructions: list[str],
+        questions: list[dict],
+        prompt_indices: list[int] | None,
+    ) -> tuple[list[list[dict[str, str]]], list[dict]]:
+        """Build (conversations, metadata) for every instruction variant x question."""
         if prompt_indices is None:
             prompt_indices = self.config.prompt_indices
 
-        # Build all conversations
+        # Prompts sharing an instruction stay adjacent so their common prefix is
+        # served from vLLM's prefix cache
         all_conversations = []
         all_metadata = []
 
@@ -124,13 +363,17 @@ class VLLMGenerator:
                     "question": question_text,
                 })
 
-        if not all_conversations:
-            return []
-
-        responses = self.generate_batch(all_conversations)
+        return all_conversations, all_metadata
 
+    @staticmethod
+    def _build_results(
+        conversations: list[list[dict[str, str]]],
+        metadata: list[dict],
+        responses: list[str],
+    ) -> list[dict]:
+        """Pair generated responses with their conversation and question metadata."""
         results = []
-        for conv, meta, response in zip(all_conversations, all_metadata, responses):
+        for conv, meta, response in zip(conversations, metadata, responses):
             result = {
                 "system_prompt": meta["system_prompt"],
                 "question_id": meta["question_id"],
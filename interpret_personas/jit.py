@@ -0,0 +1,18 @@
+"""Optional Numba JIT shared by the aggregation and visualization kernels."""
+
+try:
+    from numba import njit, prange
+except ModuleNotFoundError:  # Optional: install with '.[aggregation]'
+    njit = None
+    prange = range
+
+
+def parallel_kernel(func):
+    """
+    Compile func as a parallel, disk-cached Numba kernel.
+
+    fastmath is deliberately off: it assumes no NaN/inf, which lets reductions
+    drop NaN where the NumPy fallbacks propagate it. Only call when njit is
+    not None.
+    """
+    return njit(parallel=True, cache=True)(func)
@@ -3,6 +3,8 @@
 import logging
 from pathlib import Path
 
+import orjson
+
 
 def setup_logging(name: str) -> logging.Logger:
     """
@@ -82,3 +84,32 @@ def get_completed_roles(output_dir: Path, extension: str) -> set[str]:
         return set()
 
     return {f.stem for f in output_dir.glob(f"*.{extension}")}
+
+
+def write_jsonl(path: Path, records: list[dict]) -> None:
+    """
+    Write records as JSON Lines with a single buffered write.
+
+    Serialized with orjson (UTF-8, no ASCII escaping, like jsonlines).
+
+    Args:
+        path: Output .jsonl path
+        records: JSON-serializable dicts, one per line
+    """
+    lines = [orjson.dumps(record) for record in records]
+    with open(path, "wb") as f:
+        f.write(b"\n".join(lines) + b"\n" if lines else b"")
+
+
+def read_jsonl(path: Path) -> list[dict]:
+    """
+    Read a JSON Lines file, skipping blank lines.
+
+    Args:
+        path: Input .jsonl path
+
+    Returns:
+        List of parsed records
+    """
+    with open(path, "rb") as f:
+        return [orjson.loads(line) for line in f if line.strip()]
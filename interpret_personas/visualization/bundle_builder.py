@@ -3,20 +3,31 @@
 from __future__ import annotations
 
 import csv
-import json
 import logging
+from collections.abc import Iterator, Sequence
+from itertools import islice
 from pathlib import Path
 
 import numpy as np
+import orjson
 from sklearn.decomposition import PCA
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.neighbors import NearestNeighbors
 
 from interpret_personas.config import VisualizationConfig
+from interpret_personas.feature_store import iter_role_feature_arrays
+from interpret_personas.jit import njit, parallel_kernel, prange
 from interpret_personas.utils import ensure_dir
 
 _LOGGER = logging.getLogger(__name__)
 
+# Role files decompressed concurrently (zlib and array casts release the GIL)
+_ROLE_LOAD_WORKERS = 4
+
+# Query rows per similarity block in neighbor search; bounds the (rows, n) buffer
+_NEIGHBOR_BLOCK_ROWS = 1024
+
+# Feature records serialized per write when streaming the bundle JSON
+_JSON_ROW_GROUP = 256
+
 
 def _safe_float(value: float | np.floating, digits: int = 6) -> float:
     """Convert float-like value into a JSON-safe python float."""
@@ -25,10 +36,61 @@ def _safe_float(value: float | np.floating, digits: int = 6) -> float:
     return round(float(value), digits)
 
 
-def _load_description_cache(cache_path: Path | None) -> dict[int, dict[str, str | None]]:
-    """Load optional feature descriptions from JSON."""
-    if cache_path is None:
-        return {}
+def _safe_array(values: np.ndarray, digits: int = 6) -> np.ndarray:
+    """Vectorized _safe_float: zero non-finite values and round, as float64."""
+    values = np.asarray(values, dtype=np.float64)
+    return np.round(np.where(np.isfinite(values), values, 0.0), digits)
+
+
+def _round_array(values: np.ndarray, digits: int = 6) -> np.ndarray:
+    """Round an array to float32 for JSON output (serialized without .tolist() boxing)."""
+    return np.round(np.asarray(values, dtype=np.float32), digits)
+
+
+def _dumps_json(value: object) -> bytes:
+    """Serialize one value compactly with orjson, encoding numpy arrays natively."""
+    return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def _write_json(payload: dict, output_file: Path) -> None:
+    """
+    Stream the bundle payload to disk one top-level field at a time.
+
+    Iterator values (the per-feature records) are consumed and written in
+    groups of _JSON_ROW_GROUP items, so neither the full record list nor the
+    whole encoded document is held in memory.
+
+    Args:
+        payload: Top-level bundle fields; values may be iterators of JSON rows
+        output_file: Destination JSON path
+    """
+    with open(output_file, "wb") as f:
+        f.write(b"{")
+        for field_idx, (key, value) in enumerate(payload.items()):
+            if field_idx:
+                f.write(b",")
+            f.write(_dumps_json(key))
+            f.write(b":")
+            if not isinstance(value, Iterator):
+                f.write(_dumps_json(value))
+                continue
+
+            f.write(b"[")
+            first_group = True
+            while group := list(islice(value, _JSON_ROW_GROUP)):
+                if not first_group:
+                    f.write(b",")
+                # Strip the group's own brackets so the rows join into one array
+                f.write(_dumps_json(group)[1:-1])
+                first_group = False
+            f.write(b"]")
+        f.write(b"}")
+
+
+def _parse_description_payload(
+    payload: object, cache_path: Path
+) -> dict[int, dict[str, str | None]]:
+    """Normalize a description cache payload (list of records or id-keyed dict)."""
 
     def _coerce_feature_id(raw: object) -> int | None:
         try:
@@ -45,9 +107,6 @@ def _load_description_cache(cache_path: Path | None) -> dict[int, dict[str, str
         value = raw.strip()
         return value if value else None
 
-    with open(cache_path, "r") as f:
-        payload = json.load(f)
-
     descriptions: dict[int, dict[str, str | None]] = {}
 
     if isinstance(payload, list):
@@ -86,6 +145,20 @@ def _load_description_cache(cache_path: Path | None) -> dict[int, dict[str, str
     return descriptions
 
 
+def _load_description_cache(cache_path: Path | None) -> dict[int, dict[str, str | None]]:
+    """Load optional feature descriptions from JSON (parsed with orjson)."""
+    if cache_path is None:
+        return {}
+    return _parse_description_payload(orjson.loads(cache_path.read_bytes()), cache_path)
+
+
+def _role_key_array(arrays: dict[str, np.ndarray], role_name: str, key: str) -> np.ndarray:
+    """Pick one array out of an iter_role_feature_arrays result."""
+    if key not in arrays:
+        raise KeyError(f"Missing key '{key}' in role features for {role_name}")
+    return arrays[key]
+
+
 def _compute_split_half_stability(
     role_names: np.ndarray,
     features_dir: Path,
@@ -102,16 +175,11 @@ def _compute_split_half_stability(
 
     rng = np.random.RandomState(split_seed)
 
-    for role_idx, role_name in enumerate(role_names):
-        role_file = features_dir / f"{role_name}.npz"
-        if not role_file.exists():
-            raise FileNotFoundError(f"Missing role feature file: {role_file}")
-
-        with np.load(role_file) as role_npz:
-            if key not in role_npz:
-                raise KeyError(f"Missing key '{key}' in {role_file}")
-            response_features = role_npz[key].astype(np.float32, copy=False)
-
+    role_features = iter_role_feature_arrays(
+        features_dir, role_names, [key], max_workers=_ROLE_LOAD_WORKERS, dtype=np.float32
+    )
+    for role_idx, (role_name, arrays) in enumerate(role_features):
+        response_features = _role_key_array(arrays, role_name, key)
         if response_features.ndim != 2:
             raise ValueError(
                 f"Expected 2D response features for {role_name}, got {response_features.shape}"
@@ -131,22 +199,26 @@ def _compute_split_half_stability(
                 f"responses={response_features.shape}, baseline={question_baseline.shape}"
             )
 
-        indices = rng.permutation(response_features.shape[0])
-        midpoint = response_features.shape[0] // 2
-        first_idx = indices[:midpoint]
-        second_idx = indices[midpoint:]
+        n_responses = response_features.shape[0]
+        indices = rng.permutation(n_responses)
+        midpoint = n_responses // 2
 
-        first_mean = response_features[first_idx].mean(axis=0)
-        second_mean = response_features[second_idx].mean(axis=0)
+        # Centering is linear, so demean rows once and take both half-sums from
+        # a single shuffled gather.
         if question_baseline is not None:
-            first_mean -= question_baseline[first_idx].mean(axis=0)
-            second_mean -= question_baseline[second_idx].mean(axis=0)
-
-        a_half[role_idx] = first_mean
-        b_half[role_idx] = second_mean
-
-    numerator = (a_half * b_half).sum(axis=0)
-    denominator = np.linalg.norm(a_half, axis=0) * np.linalg.norm(b_half, axis=0)
+            response_features = response_features - question_baseline
+        shuffled = response_features[indices]
+
+        np.add.reduce(shuffled[:midpoint], axis=0, out=a_half[role_idx])
+        np.add.reduce(shuffled[midpoint:], axis=0, out=b_half[role_idx])
+        a_half[role_idx] *= 1.0 / midpoint
+        b_half[role_idx] *= 1.0 / (n_responses - midpoint)
+
+    # Column-wise dot products without materializing a_half * b_half or squares
+    numerator = np.einsum("rd,rd->d", a_half, b_half)
+    denominator = np.sqrt(
+        np.einsum("rd,rd->d", a_half, a_half) * np.einsum("rd,rd->d", b_half, b_half)
+    )
 
     stability = np.divide(
         numerator,
@@ -168,16 +240,11 @@ def _compute_question_baseline(
     total: np.ndarray | None = None
     n_responses: int | None = None
 
-    for role_name in role_names:
-        role_file = features_dir / f"{role_name}.npz"
-        if not role_file.exists():
-            raise FileNotFoundError(f"Missing role feature file: {role_file}")
-
-        with np.load(role_file) as role_npz:
-            if key not in role_npz:
-                raise KeyError(f"Missing key '{key}' in {role_file}")
-            response_features = role_npz[key].astype(np.float32, copy=False)
-
+    role_features = iter_role_feature_arrays(
+        features_dir, role_names, [key], max_workers=_ROLE_LOAD_WORKERS, dtype=np.float32
+    )
+    for role_name, arrays in role_features:
+        response_features = _role_key_array(arrays, role_name, key)
         if response_features.ndim != 2:
             raise ValueError(
                 f"Expected 2D response features for {role_name}, got {response_features.shape}"
@@ -205,6 +272,67 @@ def _compute_question_baseline(
     return total / float(len(role_names))
 
 
+def _normalize_rows(x: np.ndarray) -> np.ndarray:
+    """L2-normalize rows; all-zero rows stay zero."""
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return np.divide(x, norms, out=np.zeros_like(x), where=norms > 0)
+
+
+def _cosine_similarity_matrix(x: np.ndarray) -> np.ndarray:
+    """Pairwise cosine similarity of the rows of x as a single float32 GEMM."""
+    x_normalized = _normalize_rows(np.asarray(x, dtype=np.float32))
+    return x_normalized @ x_normalized.T
+
+
+def _top_k_neighbors(x: np.ndarray, k: int, metric: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Find each row's k nearest other rows by brute force, best first.
+
+    Similarities come from blocked matmuls (one BLAS call per block of
+    _NEIGHBOR_BLOCK_ROWS query rows), and top-k selection uses argpartition, so
+    only the k candidates per row are sorted.
+
+    Args:
+        x: (n, d) row vectors
+        k: Neighbors per row, 0 < k < n
+        metric: "cosine" (scores are similarities) or "euclidean" (scores are
+            negated squared distances up to a per-row constant)
+
+    Returns:
+        (indices, scores) arrays of shape (n, k)
+    """
+    if metric == "cosine":
+        reference = _normalize_rows(np.asarray(x, dtype=np.float32))
+        queries = reference
+        column_offset = None
+    elif metric == "euclidean":
+        # Low-dimensional inputs: float64 keeps |a|^2 - 2ab + |b|^2 exact enough
+        reference = np.asarray(x, dtype=np.float64)
+        queries = 2.0 * reference
+        column_offset = -np.einsum("ij,ij->i", reference, reference)
+    else:
+        raise ValueError(f"Unsupported metric: {metric}")
+
+    n = reference.shape[0]
+    indices = np.empty((n, k), dtype=np.int32)
+    scores = np.empty((n, k), dtype=reference.dtype)
+    for start in range(0, n, _NEIGHBOR_BLOCK_ROWS):
+        stop = min(start + _NEIGHBOR_BLOCK_ROWS, n)
+        block = queries[start:stop] @ reference.T
+        if column_offset is not None:
+            block += column_offset
+        local_rows = np.arange(stop - start)
+        block[local_rows, start + local_rows] = -np.inf
+
+        candidates = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        candidate_scores = np.take_along_axis(block, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1, kind="stable")
+        indices[start:stop] = np.take_along_axis(candidates, order, axis=1)
+        scores[start:stop] = np.take_along_axis(candidate_scores, order, axis=1)
+
+    return indices, scores
+
+
 def _compute_cosine_neighbors(x: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
     """Return cosine neighbors in high-D feature space."""
     n = x.shape[0]
@@ -215,25 +343,8 @@ def _compute_cosine_neighbors(x: np.ndarray, k: int) -> tuple[np.ndarray, np.nda
         )
 
     k_eff = min(k, n - 1)
-    nn = NearestNeighbors(metric="cosine", algorithm="brute", n_neighbors=k_eff + 1)
-    nn.fit(x)
-    distances, indices = nn.kneighbors(x, return_distance=True)
-
-    neighbor_indices = np.full((n, k_eff), -1, dtype=np.int32)
-    neighbor_similarities = np.zeros((n, k_eff), dtype=np.float32)
-
-    for row_idx in range(n):
-        row_indices = indices[row_idx]
-        row_distances = distances[row_idx]
-        mask = row_indices != row_idx
-        filtered_indices = row_indices[mask][:k_eff]
-        filtered_similarities = 1.0 - row_distances[mask][:k_eff]
-        neighbor_indices[row_idx, : len(filtered_indices)] = filtered_indices
-        neighbor_similarities[row_idx, : len(filtered_similarities)] = (
-            filtered_similarities
-        )
-
-    return neighbor_indices, neighbor_similarities
+    neighbor_indices, neighbor_similarities = _top_k_neighbors(x, k_eff, metric="cosine")
+    return neighbor_indices, neighbor_similarities.astype(np.float32, copy=False)
 
 
 def _compute_knn_overlap(
@@ -247,92 +358,132 @@ def _compute_knn_overlap(
         return 0.0
 
     k_eff = min(k, n - 1)
-    high_nn = NearestNeighbors(metric="cosine", algorithm="brute", n_neighbors=k_eff + 1)
-    low_nn = NearestNeighbors(metric="euclidean", algorithm="auto", n_neighbors=k_eff + 1)
+    high_indices, _ = _top_k_neighbors(high_d_vectors, k_eff, metric="cosine")
+    low_indices, _ = _top_k_neighbors(low_d_vectors, k_eff, metric="euclidean")
+
+    # Offset each row's ids by row * n so all rows share one sorted array and a
+    # single searchsorted answers every membership query.
+    row_offsets = np.arange(n, dtype=np.int64)[:, None] * n
+    low_keys = np.sort(low_indices + row_offsets, axis=1).ravel()
+    high_keys = (high_indices + row_offsets).ravel()
+    positions = np.minimum(np.searchsorted(low_keys, high_keys), low_keys.size - 1)
+    hits = (low_keys[positions] == high_keys).reshape(n, k_eff)
+
+    overlaps = hits.sum(axis=1, dtype=np.float32) / k_eff
+    return float(overlaps.mean())
 
-    high_nn.fit(high_d_vectors)
-    low_nn.fit(low_d_vectors)
 
-    high_indices = high_nn.kneighbors(high_d_vectors, return_distance=False)[:, 1:]
-    low_indices = low_nn.kneighbors(low_d_vectors, return_distance=False)[:, 1:]
+if njit is not None:
 
-    overlaps = np.zeros(n, dtype=np.float32)
-    for row_idx in range(n):
-        a_set = set(high_indices[row_idx].tolist())
-        b_set = set(low_indices[row_idx].tolist())
-        overlaps[row_idx] = len(a_set.intersection(b_set)) / k_eff
+    @parallel_kernel
+    def _bridge_entropy_kernel(values, out):
+        """Entropy of each column's positive part in one pass: H = log(s) - sum(v log v) / s."""
+        n_rows, n_cols = values.shape
+        for j in prange(n_cols):
+            total = 0.0
+            weighted_log = 0.0
+            for i in range(n_rows):
+                value = float(values[i, j])
+                if value > 0.0:
+                    total += value
+                    weighted_log += value * np.log(value)
+                elif value != value:
+                    # As in the NumPy path, a NaN makes the column total fail "> 0": entropy 0
+                    total = np.nan
+                    break
+            out[j] = np.log(total) - weighted_log / total if total > 0.0 else 0.0
 
-    return float(overlaps.mean())
+else:
+    _bridge_entropy_kernel = None
+
+
+def _bridge_entropy(role_values: np.ndarray) -> np.ndarray:
+    """
+    Shannon entropy (nats) of each feature's distribution over roles.
+
+    Negative role values are treated as zero; features with no positive mass get 0.
+
+    Args:
+        role_values: (n_roles, n_features) role activations
+
+    Returns:
+        (n_features,) float32 entropies
+    """
+    if _bridge_entropy_kernel is not None:
+        entropy = np.empty(role_values.shape[1], dtype=np.float32)
+        _bridge_entropy_kernel(np.ascontiguousarray(role_values, dtype=np.float32), entropy)
+        return entropy
+
+    non_negative_vals = np.clip(role_values, 0.0, None)
+    totals = non_negative_vals.sum(axis=0, keepdims=True)
+    probs = np.divide(
+        non_negative_vals,
+        totals,
+        out=np.zeros_like(non_negative_vals),
+        where=totals > 0,
+    )
+    log_probs = np.zeros_like(probs)
+    np.log(probs, out=log_probs, where=probs > 0)
+    return -(probs * log_probs).sum(axis=0)
 
 
-def _top_roles_for_feature(
+def _top_roles_for_features(
     role_values: np.ndarray,
     role_names: np.ndarray,
     top_n: int,
-) -> list[dict[str, float | int | str]]:
-    """Build top role summary for a single feature."""
-    order = np.argsort(role_values)[::-1][:top_n]
-    total = role_values.sum()
-
-    top_roles: list[dict[str, float | int | str]] = []
-    for role_idx in order:
-        value = float(role_values[role_idx])
-        share = value / total if total > 0 else 0.0
-        top_roles.append(
-            {
-                "role_idx": int(role_idx),
-                "role": str(role_names[role_idx]),
-                "activation": _safe_float(value),
-                "share": _safe_float(share),
-            }
+) -> list[list[dict[str, float | int | str]]]:
+    """
+    Build top role summaries for every feature column at once.
+
+    Args:
+        role_values: (n_roles, n_features) role activations
+        role_names: Role name per row
+        top_n: Roles to keep per feature
+
+    Returns:
+        One list of top-role dicts (highest activation first) per feature
+    """
+    n_roles, n_features = role_values.shape
+    top_n = min(top_n, n_roles)
+    if top_n < n_roles:
+        candidates = np.argpartition(-role_values, top_n - 1, axis=0)[:top_n]
+    else:
+        candidates = np.broadcast_to(np.arange(n_roles)[:, None], role_values.shape)
+    candidate_values = np.take_along_axis(role_values, candidates, axis=0)
+    order = np.argsort(-candidate_values, axis=0, kind="stable")
+    top_idx = np.take_along_axis(candidates, order, axis=0).T
+    top_values = np.take_along_axis(candidate_values, order, axis=0).T.astype(np.float64)
+
+    totals = role_values.sum(axis=0, dtype=np.float64)[:, None]
+    shares = np.divide(top_values, totals, out=np.zeros_like(top_values), where=totals > 0)
+
+    top_names = role_names[top_idx].tolist()
+    activations = _safe_array(top_values).tolist()
+    shares = _safe_array(shares).tolist()
+    return [
+        [
+            {"role_idx": role_idx, "role": str(name), "activation": value, "share": share}
+            for role_idx, name, value, share in zip(idx_row, name_row, value_row, share_row)
+        ]
+        for idx_row, name_row, value_row, share_row in zip(
+            top_idx.tolist(), top_names, activations, shares
         )
-    return top_roles
-
-
-def _save_feature_csv(feature_rows: list[dict], output_file: Path) -> None:
-    """Save flattened feature table for quick export workflows."""
-    columns = [
-        "feature_row",
-        "feature_id",
-        "preferred_role",
-        "score",
-        "stability",
-        "sd",
-        "mu",
-        "pref_ratio",
-        "active_frac",
-        "cv",
-        "mean_activation",
-        "max_activation",
-        "bridge_entropy",
-        "description",
-        "neuronpedia_url",
     ]
 
+
+def _save_feature_csv(columns: dict[str, Sequence], output_file: Path) -> None:
+    """
+    Save flattened feature table for quick export workflows.
+
+    Args:
+        columns: Ordered mapping of column name to equal-length value sequences
+        output_file: Destination CSV path
+    """
     with open(output_file, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=columns)
-        writer.writeheader()
-        for row in feature_rows:
-            metrics = row["metrics"]
-            writer.writerow(
-                {
-                    "feature_row": row["feature_row"],
-                    "feature_id": row["feature_id"],
-                    "preferred_role": row["preferred_role"],
-                    "score": metrics["score"],
-                    "stability": metrics["stability"],
-                    "sd": metrics["sd"],
-                    "mu": metrics["mu"],
-                    "pref_ratio": metrics["pref_ratio"],
-                    "active_frac": metrics["active_frac"],
-                    "cv": metrics["cv"],
-                    "mean_activation": metrics["mean_activation"],
-                    "max_activation": metrics["max_activation"],
-                    "bridge_entropy": metrics["bridge_entropy"],
-                    "description": row["description"] or "",
-                    "neuronpedia_url": row["neuronpedia_url"] or "",
-                }
-            )
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        # Rows are zipped straight from the columns; no per-row dict or DictWriter lookup
+        writer.writerows(zip(*columns.values()))
 
 
 def build_visualization_bundle(config: VisualizationConfig, logger) -> Path:
@@ -370,12 +521,21 @@ def build_visualization_bundle(config: VisualizationConfig, logger) -> Path:
         role_matrix = np.log1p(features)
 
     logger.info("Step 1/6: Applying basic variance filter...")
-    mu = role_matrix.mean(axis=0)
-    sd = role_matrix.std(axis=0)
+    # One sweep for both moments; np.std would re-stream the matrix and
+    # materialize role_matrix - mu. Sums accumulate in float64: E[x^2] - mu^2
+    # cancels catastrophically in float32 for non-centered (log1p) features.
+    mu = np.add.reduce(role_matrix, axis=0, dtype=np.float64) / n_roles
+    sd = np.einsum("ij,ij->j", role_matrix, role_matrix, dtype=np.float64) / n_roles
+    sd -= mu * mu
+    np.maximum(sd, 0.0, out=sd)
+    sd = np.sqrt(sd).astype(np.float32)
+    mu = mu.astype(np.float32)
 
     alive = np.linalg.norm(role_matrix, axis=0) > 0 if config.question_centering else mu > 0
-    sd_threshold = float(np.median(sd[alive])) if alive.any() else 0.0
-    pass_basic = alive & (sd >= sd_threshold)
+    # sd[alive] is already a private copy, so median may partition it in place
+    sd_threshold = float(np.median(sd[alive], overwrite_input=True)) if alive.any() else 0.0
+    pass_basic = sd >= sd_threshold
+    pass_basic &= alive
     logger.info(
         f"Basic filter retained {int(pass_basic.sum()):,}/{sae_dim:,} features "
         f"(sd threshold={sd_threshold:.6f})"
@@ -406,18 +566,24 @@ def build_visualization_bundle(config: VisualizationConfig, logger) -> Path:
     question_baseline = None
 
     logger.info("Step 3/6: Ranking features by stability x variance...")
-    score = stability * sd
-    score[~pass_basic] = -1.0
+    score = np.multiply(
+        stability,
+        sd,
+        out=np.full(sae_dim, -1.0, dtype=np.float32),
+        where=pass_basic,
+    )
 
-    ranking = np.argsort(score)[::-1]
+    # Partition out the top_k scores, then sort only those
     top_k = min(config.top_k, sae_dim)
-    selected = ranking[:top_k]
+    candidates = np.argpartition(-score, top_k - 1)[:top_k]
+    selected = candidates[np.argsort(-score[candidates], kind="stable")]
     logger.info(f"Selected top {top_k:,} features")
 
     logger.info("Step 4/6: Precomputing high-D structures...")
-    x = role_matrix[:, selected].T.astype(np.float32, copy=False)
-    preferred_role_idx = role_matrix[:, selected].argmax(axis=0)
+    # Gather the selected columns once; every high-D structure below reads them.
     role_values_selected = role_matrix[:, selected]
+    x = np.ascontiguousarray(role_values_selected.T, dtype=np.float32)
+    preferred_role_idx = role_values_selected.argmax(axis=0)
     role_values_for_top_roles = (
         np.clip(role_values_selected, 0.0, None)
         if config.question_centering
@@ -439,20 +605,11 @@ def build_visualization_bundle(config: VisualizationConfig, logger) -> Path:
         else np.maximum(mu[selected], 1e-8)
     )
     cv = np.divide(sd[selected], cv_denominator)
-    mean_activation = features[:, selected].mean(axis=0)
-    max_activation = features[:, selected].max(axis=0)
+    features_selected = features[:, selected]
+    mean_activation = features_selected.mean(axis=0)
+    max_activation = features_selected.max(axis=0)
 
-    non_negative_vals = np.clip(role_values_selected, 0.0, None)
-    totals = non_negative_vals.sum(axis=0, keepdims=True)
-    probs = np.divide(
-        non_negative_vals,
-        totals,
-        out=np.zeros_like(non_negative_vals),
-        where=totals > 0,
-    )
-    log_probs = np.zeros_like(probs)
-    np.log(probs, out=log_probs, where=probs > 0)
-    entropy = -(probs * log_probs).sum(axis=0)
+    entropy = _bridge_entropy(role_values_selected)
     if n_roles > 1:
         entropy /= np.log(float(n_roles))
 
@@ -461,8 +618,7 @@ def build_visualization_bundle(config: VisualizationConfig, logger) -> Path:
         config.neighbor_k,
     )
 
-    role_vectors = role_matrix[:, selected]
-    role_similarity = cosine_similarity(role_vectors)
+    role_similarity = _cosine_similarity_matrix(role_values_selected)
 
     logger.info("Step 5/6: Computing map coordinates and quality metrics...")
     umap = UMAP(
@@ -486,34 +642,48 @@ def build_visualization_bundle(config: VisualizationConfig, logger) -> Path:
     logger.info("Step 6/6: Assembling bundle payload...")
     descriptions = _load_description_cache(config.description_cache)
 
-    feature_rows: list[dict] = []
-    for feature_row, feature_id in enumerate(selected.tolist()):
-        desc_item = descriptions.get(feature_id, {})
-        feature_rows.append(
-            {
-                "feature_row": feature_row,
-                "feature_id": int(feature_id),
-                "preferred_role_idx": int(preferred_role_idx[feature_row]),
-                "preferred_role": str(role_names[preferred_role_idx[feature_row]]),
-                "top_roles": _top_roles_for_feature(
-                    role_values_for_top_roles[:, feature_row], role_names, top_n=3
-                ),
-                "metrics": {
-                    "score": _safe_float(score[feature_id]),
-                    "stability": _safe_float(stability[feature_id]),
-                    "sd": _safe_float(sd[feature_id]),
-                    "mu": _safe_float(mu[feature_id]),
-                    "pref_ratio": _safe_float(pref_ratio[feature_row]),
-                    "active_frac": _safe_float(active_frac[feature_row]),
-                    "cv": _safe_float(cv[feature_row]),
-                    "mean_activation": _safe_float(mean_activation[feature_row]),
-                    "max_activation": _safe_float(max_activation[feature_row]),
-                    "bridge_entropy": _safe_float(entropy[feature_row]),
-                },
-                "description": desc_item.get("description"),
-                "neuronpedia_url": desc_item.get("url"),
-            }
+    top_roles = _top_roles_for_features(role_values_for_top_roles, role_names, top_n=3)
+
+    # Sanitize every metric column once instead of per-feature scalar calls
+    metric_columns = {
+        name: _safe_array(values).tolist()
+        for name, values in (
+            ("score", score[selected]),
+            ("stability", stability[selected]),
+            ("sd", sd[selected]),
+            ("mu", mu[selected]),
+            ("pref_ratio", pref_ratio),
+            ("active_frac", active_frac),
+            ("cv", cv),
+            ("mean_activation", mean_activation),
+            ("max_activation", max_activation),
+            ("bridge_entropy", entropy),
         )
+    }
+    metric_rows = [
+        dict(zip(metric_columns, row_values)) for row_values in zip(*metric_columns.values())
+    ]
+    feature_ids = selected.tolist()
+    preferred_role_ids = preferred_role_idx.tolist()
+    preferred_roles = role_names[preferred_role_idx].tolist()
+    desc_items = [descriptions.get(feature_id, {}) for feature_id in feature_ids]
+    feature_descriptions = [item.get("description") for item in desc_items]
+    neuronpedia_urls = [item.get("url") for item in desc_items]
+
+    # Built lazily; _write_json consumes these in row groups while streaming
+    feature_rows = (
+        {
+            "feature_row": feature_row,
+            "feature_id": feature_id,
+            "preferred_role_idx": preferred_role_ids[feature_row],
+            "preferred_role": preferred_roles[feature_row],
+            "top_roles": top_roles[feature_row],
+            "metrics": metric_rows[feature_row],
+            "description": feature_descriptions[feature_row],
+            "neuronpedia_url": neuronpedia_urls[feature_row],
+        }
+        for feature_row, feature_id in enumerate(feature_ids)
+    )
 
     dataset_dir = ensure_dir(config.output_dir / config.dataset_name)
     bundle_file = dataset_dir / "bundle.json"
@@ -553,26 +723,33 @@ def build_visualization_bundle(config: VisualizationConfig, logger) -> Path:
             "knn_overlap_score": _safe_float(knn_overlap),
         },
         "roles": role_names.tolist(),
-        "feature_ids": selected.astype(int).tolist(),
+        "feature_ids": np.ascontiguousarray(selected, dtype=np.int64),
         "coords": {
-            "umap": np.asarray(coords_umap, dtype=np.float32).round(6).tolist(),
-            "pca": np.asarray(coords_pca, dtype=np.float32).round(6).tolist(),
+            "umap": _round_array(coords_umap),
+            "pca": _round_array(coords_pca),
         },
         "neighbors": {
             "k": int(neighbor_indices.shape[1]),
-            "indices": neighbor_indices.astype(int).tolist(),
-            "similarities": np.asarray(
-                neighbor_similarities, dtype=np.float32
-            ).round(6).tolist(),
+            "indices": np.ascontiguousarray(neighbor_indices, dtype=np.int32),
+            "similarities": _round_array(neighbor_similarities),
         },
-        "role_similarity": np.asarray(role_similarity, dtype=np.float32).round(6).tolist(),
+        "role_similarity": _round_array(role_similarity),
         "features": feature_rows,
     }
 
-    with open(bundle_file, "w") as f:
-        json.dump(bundle_payload, f, ensure_ascii=True, indent=2)
+    _write_json(bundle_payload, bundle_file)
 
-    _save_feature_csv(feature_rows, summary_csv)
+    _save_feature_csv(
+        {
+            "feature_row": range(top_k),
+            "feature_id": feature_ids,
+            "preferred_role": preferred_roles,
+            **metric_columns,
+            "description": [text or "" for text in feature_descriptions],
+            "neuronpedia_url": [url or "" for url in neuronpedia_urls],
+        },
+        summary_csv,
+    )
 
     logger.info(f"Bundle written: {bundle_file}")
     logger.info(f"Feature table written: {summary_csv}")
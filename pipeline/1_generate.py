@@ -11,17 +11,61 @@ Output:
 """
 
 import argparse
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 
-import jsonlines
-
 from interpret_personas.config import GenerationConfig
 from interpret_personas.generation.data_loader import (
     iter_roles,
     load_general_questions,
 )
-from interpret_personas.generation.generator import VLLMGenerator
-from interpret_personas.utils import get_completed_roles, setup_logging
+from interpret_personas.utils import get_completed_roles, setup_logging, write_jsonl
+
+
+def load_generator(config: GenerationConfig):
+    """Start the vLLM engine (vLLM and torch are imported only here)."""
+    from interpret_personas.generation.generator import VLLMGenerator
+
+    return VLLMGenerator(config)
+
+
+def write_role_results(output_file: Path, results: list[dict], logger) -> None:
+    """Write one role's results as JSONL (runs on the background writer thread)."""
+    write_jsonl(output_file, results)
+    logger.info(f"Saved {len(results)} responses to {output_file}")
+
+
+def generate_and_save(
+    generator, roles, output_dir: Path, logger, writer_pool: ThreadPoolExecutor
+) -> list[Future]:
+    """
+    Generate responses for a group of roles in one vLLM call and queue one JSONL write per role.
+
+    Writes run on writer_pool so the next group's generation starts immediately.
+
+    Returns:
+        Futures of the queued role writes
+    """
+    logger.info(f"Generating for {len(roles)} roles: {[role.name for role in roles]}")
+    results_by_role = generator.generate_for_roles(roles)
+
+    writes = []
+    for role_data in roles:
+        results = results_by_role.get(role_data.name, [])
+        if not results:
+            logger.warning(f"No results generated for {role_data.name}")
+            continue
+
+        output_file = output_dir / f"{role_data.name}.jsonl"
+        writes.append(writer_pool.submit(write_role_results, output_file, results, logger))
+    return writes
+
+
+def wait_for_writes(writes: list[Future]) -> int:
+    """Block until the given role writes finish, re-raising any write error."""
+    for write in writes:
+        write.result()
+    return len(writes)
 
 
 def main():
@@ -58,8 +102,12 @@ def main():
     logger.info(f"Roles directory: {config.roles_dir}")
     logger.info(f"Output directory: {output_dir}")
     logger.info(f"Prompt indices: {config.prompt_indices}")
-
-    generator = VLLMGenerator(config)
+    logger.info(f"Roles per generate call: {config.roles_per_batch}")
+    if config.enforce_eager:
+        logger.warning("enforce_eager is set: CUDA graphs are disabled and decode will be slower")
+    else:
+        capture_sizes = config.cudagraph_capture_sizes or "vLLM default"
+        logger.info(f"CUDA graph capture sizes: {capture_sizes}")
 
     logger.info(f"Loading general questions from {config.general_questions_file}")
     general_questions = load_general_questions(config.general_questions_file)
@@ -72,11 +120,21 @@ def main():
 
     total_roles = 0
     processed_roles = 0
+    pending_roles = []
 
     role_filter = set(args.roles) if args.roles else None
     if role_filter:
         logger.info(f"Filtering to {len(role_filter)} roles: {sorted(role_filter)}")
 
+    # The vLLM engine starts with the first group that needs generating, so runs
+    # where every role is skipped exit without loading the model
+    generator = None
+
+    # One writer thread: JSONL serialization overlaps the next group's generation,
+    # and waiting on the previous group's writes bounds memory and surfaces errors
+    writer_pool = ThreadPoolExecutor(max_workers=1)
+    pending_writes: list[Future] = []
+
     for role_data in iter_roles(config.roles_dir, general_questions):
         total_roles += 1
 
@@ -102,27 +160,26 @@ def main():
             raise ValueError(f"Invalid question_mode: {config.question_mode}")
 
         logger.info(
-            f"Generating for {role_data.name} "
+            f"Queued {role_data.name} "
             f"({len(role_data.instructions)} instructions × {len(questions)} questions)"
         )
-
-        results = generator.generate_for_role(
-            instructions=role_data.instructions,
-            questions=questions,
-            prompt_indices=config.prompt_indices,
-        )
-
-        if not results:
-            logger.warning(f"No results generated for {role_data.name}")
-            continue
-
-        output_file = output_dir / f"{role_data.name}.jsonl"
-        with jsonlines.open(output_file, "w") as writer:
-            for result in results:
-                writer.write(result)
-
-        logger.info(f"Saved {len(results)} responses to {output_file}")
-        processed_roles += 1
+        pending_roles.append(role_data)
+
+        if len(pending_roles) >= config.roles_per_batch:
+            generator = generator or load_generator(config)
+            writes = generate_and_save(generator, pending_roles, output_dir, logger, writer_pool)
+            processed_roles += wait_for_writes(pending_writes)
+            pending_writes = writes
+            pending_roles = []
+
+    if pending_roles:
+        generator = generator or load_generator(config)
+        writes = generate_and_save(generator, pending_roles, output_dir, logger, writer_pool)
+        processed_roles += wait_for_writes(pending_writes)
+        pending_writes = writes
+
+    processed_roles += wait_for_writes(pending_writes)
+    writer_pool.shutdown(wait=True)
 
     logger.info(f"Processed {processed_roles}/{total_roles} roles")
 
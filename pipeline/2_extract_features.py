@@ -2,8 +2,9 @@
 """Extract SAE features from responses.
 
 This script extracts SAE features from generated responses using a specified SAE model.
-Features are aggregated per-response (mean and max across tokens) and saved as compressed
-.npz files. Metadata lives in the stage 1 response JSONL files (row indices match).
+Features are aggregated per-response (mean and max across tokens) and saved as float16
+(or per-row scaled int8) .npz files, zlib-compressed unless compress_features is false.
+Metadata lives in the stage 1 response JSONL files (row indices match).
 
 Usage:
     python pipeline/2_extract_features.py --config configs/extraction.yaml [--skip-existing]
@@ -13,15 +14,29 @@ Output:
 """
 
 import argparse
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from pathlib import Path
 
-import jsonlines
 import numpy as np
 
 from interpret_personas.config import ExtractionConfig
-from interpret_personas.extraction.sae_loader import load_sae_model
-from interpret_personas.extraction.feature_extractor import FeatureExtractor
-from interpret_personas.utils import get_completed_roles, setup_logging
+from interpret_personas.feature_store import save_role_features
+from interpret_personas.utils import get_completed_roles, read_jsonl, setup_logging
+
+# Forward-pass batches per extract_from_conversations call (one progress line each)
+BATCHES_PER_CHUNK = 16
+
+# Background processes writing finished roles' .npz files
+SAVE_WORKERS = 2
+
+
+def wait_for_save(pending: tuple[Future, int], logger) -> None:
+    """Block until a queued role save finishes, re-raising any save error."""
+    save, n_responses = pending
+    npz_file = save.result()
+    logger.info(f"Saved {n_responses} responses to {npz_file}")
 
 
 def main():
@@ -52,24 +67,18 @@ def main():
     config.validate()
 
     logger.info(f"Model: {config.model_name}")
-    logger.info(f"SAE: {config.sae_release}/{config.sae_id}")
+    logger.info(f"SAE: {config.sae_release}/{config.sae_id} ({config.sae_dtype})")
     logger.info(f"Token selection: {config.token_selection}")
+    logger.info(f"Batch size: {config.batch_size}")
+    logger.info(f"Compile SAE encode: {config.compile_sae}")
+    logger.info(f"Feature cache: {config.feature_cache_dir or 'disabled'}")
+    logger.info(
+        f"Feature storage: {config.feature_dtype}, "
+        f"{'zlib-compressed' if config.compress_features else 'uncompressed'} .npz"
+    )
     logger.info(f"Responses directory: {config.responses_dir}")
     logger.info(f"Output directory: {config.output_dir}")
 
-    logger.info("Loading SAE model...")
-    model, sae, tokenizer = load_sae_model(
-        model_name=config.model_name,
-        sae_release=config.sae_release,
-        sae_id=config.sae_id,
-    )
-
-    extractor = FeatureExtractor(
-        model=model,
-        sae=sae,
-        tokenizer=tokenizer,
-    )
-
     # Get completed roles (for resumption)
     completed = get_completed_roles(config.output_dir, extension="npz") if args.skip_existing else set()
     if completed:
@@ -86,52 +95,109 @@ def main():
         response_files = list(config.responses_dir.glob("*.jsonl"))
     logger.info(f"Found {len(response_files)} role files to process")
 
-    total_roles = 0
-    processed_roles = 0
-
-    for response_file in sorted(response_files):
-        role_name = response_file.stem
-        total_roles += 1
+    if all(f.stem in completed for f in response_files):
+        logger.info(f"Processed 0/{len(response_files)} roles (nothing left to extract)")
+        return
 
-        if role_name in completed:
-            logger.info(f"Skipping {role_name} (already exists)")
-            continue
+    # Imported here so --help and fully-skipped runs don't pay for torch/transformers,
+    # and spawned save workers (which re-import this script) never load them
+    from interpret_personas.extraction.feature_extractor import FeatureExtractor
+    from interpret_personas.extraction.sae_loader import load_sae_model
 
-        logger.info(f"Processing {role_name}...")
-
-        # Read responses
-        with jsonlines.open(response_file, "r") as reader:
-            responses = list(reader)
-
-        logger.info(f"Extracting features from {len(responses)} responses...")
-
-        mean_list = []
-        max_list = []
-
-        for i, resp in enumerate(responses):
-
-            aggregated = extractor.extract_from_conversation(
-                conversation=resp["conversation"],
-                token_selection=config.token_selection,
-            )
+    logger.info("Loading SAE model...")
+    model, sae, tokenizer = load_sae_model(
+        model_name=config.model_name,
+        sae_release=config.sae_release,
+        sae_id=config.sae_id,
+        sae_dtype=config.sae_dtype,
+    )
 
-            mean_list.append(aggregated["mean"])
-            max_list.append(aggregated["max"])
+    extractor = FeatureExtractor(
+        model=model,
+        sae=sae,
+        tokenizer=tokenizer,
+        compile_sae=config.compile_sae,
+        cache_dir=config.feature_cache_dir,
+    )
 
-            if (i + 1) % 100 == 0:
-                logger.info(f"  Processed {i + 1}/{len(responses)} responses")
+    sae_dim = sae.cfg.d_sae
 
-        npz_file = config.output_dir / f"{role_name}.npz"
-        np.savez_compressed(
-            npz_file,
-            mean_features=np.array(mean_list),   # [n_responses, sae_dim]
-            max_features=np.array(max_list),      # [n_responses, sae_dim]
-        )
+    total_roles = 0
+    processed_roles = 0
 
-        logger.info(f"Saved {len(responses)} responses to {npz_file}")
-        processed_roles += 1
+    # Quantization, zlib deflate and the disk write run in worker processes so the
+    # next role's extraction starts immediately; spawn, because forking a process
+    # that has initialized CUDA is unsafe
+    with ProcessPoolExecutor(
+        max_workers=SAVE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+    ) as save_pool:
+        pending_saves: deque[tuple[Future, int]] = deque()
+
+        for response_file in sorted(response_files):
+            role_name = response_file.stem
+            total_roles += 1
+
+            if role_name in completed:
+                logger.info(f"Skipping {role_name} (already exists)")
+                continue
+
+            logger.info(f"Processing {role_name}...")
+
+            # Read responses
+            responses = read_jsonl(response_file)
+
+            logger.info(f"Extracting features from {len(responses)} responses...")
+
+            # Rows are written in place as they are extracted; no per-response list
+            # or final stack copy
+            mean_features = np.empty((len(responses), sae_dim), dtype=np.float16)
+            max_features = np.empty((len(responses), sae_dim), dtype=np.float16)
+
+            # Padded batches of config.batch_size conversations per forward pass; chunking
+            # bounds the float32 staging buffers and sets the progress-log cadence
+            chunk_size = config.batch_size * BATCHES_PER_CHUNK
+            for start in range(0, len(responses), chunk_size):
+                chunk = responses[start : start + chunk_size]
+                aggregated = extractor.extract_from_conversations(
+                    [resp["conversation"] for resp in chunk],
+                    token_selection=config.token_selection,
+                    batch_size=config.batch_size,
+                )
+
+                mean_features[start : start + len(chunk)] = aggregated["mean"]
+                max_features[start : start + len(chunk)] = aggregated["max"]
+
+                logger.info(f"  Processed {start + len(chunk)}/{len(responses)} responses")
+
+            arrays = {
+                "mean_features": mean_features,   # [n_responses, sae_dim]
+                "max_features": max_features,     # [n_responses, sae_dim]
+            }
+            npz_file = config.output_dir / f"{role_name}.npz"
+            pending_saves.append((
+                save_pool.submit(
+                    save_role_features,
+                    npz_file,
+                    arrays,
+                    config.feature_dtype,
+                    config.compress_features,
+                ),
+                len(responses),
+            ))
+            # Bound queued saves so finished roles' arrays don't pile up in memory
+            while len(pending_saves) > SAVE_WORKERS:
+                wait_for_save(pending_saves.popleft(), logger)
+                processed_roles += 1
+
+        while pending_saves:
+            wait_for_save(pending_saves.popleft(), logger)
+            processed_roles += 1
 
     logger.info(f"Processed {processed_roles}/{total_roles} roles")
+    if config.feature_cache_dir is not None:
+        logger.info(
+            f"Feature cache: {extractor.cache_hits} hits, {extractor.cache_misses} misses"
+        )
 
 
 if __name__ == "__main__":
@@ -17,9 +17,13 @@ from pathlib import Path
 import numpy as np
 
 from interpret_personas.config import AggregationConfig
-from interpret_personas.aggregation.aggregator import AGGREGATION_FUNCTIONS
+from interpret_personas.feature_store import iter_role_feature_arrays
 from interpret_personas.utils import ensure_dir, setup_logging
 
+# Role files loaded concurrently (file reads and zlib inflate release the GIL);
+# up to twice this many roles are held in memory at once
+_LOAD_WORKERS = 4
+
 
 def main():
     parser = argparse.ArgumentParser(description="Aggregate features at role level")
@@ -31,6 +35,10 @@ def main():
     )
     args = parser.parse_args()
 
+    # Imported after argument parsing: the aggregator pulls in Numba, which
+    # would otherwise dominate --help
+    from interpret_personas.aggregation.aggregator import AGGREGATION_FUNCTIONS
+
     # Load and validate config
     logger = setup_logging("aggregation")
     logger.info(f"Loading config from {args.config}")
@@ -46,35 +54,53 @@ def main():
     npz_files = sorted(config.features_dir.glob("*.npz"))
     logger.info(f"Found {len(npz_files)} role .npz files to process")
 
-    # Aggregate per-role for each strategy
-    for strategy_name, func in AGGREGATION_FUNCTIONS.items():
-        logger.info(f"Aggregating with strategy: {strategy_name}")
-
-        role_names = []
-        role_vectors = []
-        strategy_key = f"{strategy_name}_features"  # "mean_features" or "max_features"
-
-        for npz_file in npz_files:
-            role_name = npz_file.stem
-            data = np.load(npz_file)
+    strategy_keys = {
+        strategy_name: f"{strategy_name}_features"  # "mean_features" or "max_features"
+        for strategy_name in AGGREGATION_FUNCTIONS
+    }
+
+    # Files outer, strategies inner: each role file is opened once and both of
+    # its arrays are reduced while it is hot, instead of one pass per strategy.
+    # Role vectors are written straight into one preallocated [n_roles, sae_dim]
+    # matrix per strategy, allocated once the first role fixes sae_dim.
+    role_names_by_strategy = {strategy_name: [] for strategy_name in AGGREGATION_FUNCTIONS}
+    role_matrix_by_strategy: dict[str, np.ndarray] = {}
+
+    # Later role files load on background threads while the current one is reduced;
+    # arrays are [n_responses, sae_dim] per key (int8 files dequantized to float32)
+    role_arrays = iter_role_feature_arrays(
+        config.features_dir,
+        [npz_file.stem for npz_file in npz_files],
+        list(strategy_keys.values()),
+        max_workers=min(_LOAD_WORKERS, max(len(npz_files), 1)),
+    )
+    for role_name, arrays in role_arrays:
+        npz_file = config.features_dir / f"{role_name}.npz"
 
-            if strategy_key not in data:
+        for strategy_name, func in AGGREGATION_FUNCTIONS.items():
+            strategy_key = strategy_keys[strategy_name]
+            if strategy_key not in arrays:
                 logger.warning(f"Key '{strategy_key}' not found in {npz_file}, skipping")
                 continue
 
-            # data[strategy_key] shape: [n_responses, sae_dim]
-            response_features = data[strategy_key]
+            response_features = arrays[strategy_key]
             n_responses = response_features.shape[0]
 
             # Aggregate across responses for this role
             role_vector = func(response_features)  # [sae_dim]
-
+            if strategy_name not in role_matrix_by_strategy:
+                role_matrix_by_strategy[strategy_name] = np.empty(
+                    (len(npz_files), role_vector.shape[0]), dtype=role_vector.dtype
+                )
+            role_names = role_names_by_strategy[strategy_name]
+            role_matrix_by_strategy[strategy_name][len(role_names)] = role_vector
             role_names.append(role_name)
-            role_vectors.append(role_vector)
 
-            logger.info(f"  {role_name}: {n_responses} responses -> 1 role vector")
+            logger.info(f"  {role_name} ({strategy_name}): {n_responses} responses -> 1 role vector")
 
-        if not role_vectors:
+    for strategy_name in AGGREGATION_FUNCTIONS:
+        role_names = role_names_by_strategy[strategy_name]
+        if not role_names:
             logger.warning(f"No role vectors for strategy '{strategy_name}', skipping")
             continue
 
@@ -84,11 +110,11 @@ def main():
 
         np.savez_compressed(
             output_file,
-            features=np.array(role_vectors),       # [n_roles, sae_dim]
+            features=role_matrix_by_strategy[strategy_name][: len(role_names)],  # [n_roles, sae_dim]
             role_names=np.array(role_names),
         )
 
-        logger.info(f"  Saved {len(role_vectors)} role vectors to {output_file}")
+        logger.info(f"  Saved {len(role_names)} role vectors to {output_file}")
 
     logger.info("Done! Aggregation complete.")
 
@@ -2,7 +2,7 @@
 """Build visualization bundle for the SAE Persona Feature Explorer.
 
 Usage:
-    python pipeline/4_build_viz_bundle.py --config configs/visualization.yaml
+    python pipeline/4_build_viz_bundle.py --config configs/visualization.yaml [--migrate-npy]
 
 Output:
     outputs/viz_bundle/{dataset_name}/bundle.json
@@ -13,6 +13,7 @@ import argparse
 from pathlib import Path
 
 from interpret_personas.config import VisualizationConfig
+from interpret_personas.feature_store import migrate_npz_to_npy
 from interpret_personas.utils import setup_logging
 from interpret_personas.visualization import build_visualization_bundle
 
@@ -25,6 +26,11 @@ def main():
         required=True,
         help="Path to visualization config YAML file",
     )
+    parser.add_argument(
+        "--migrate-npy",
+        action="store_true",
+        help="Write uncompressed .npy copies of role features first (memory-mapped on load)",
+    )
     args = parser.parse_args()
 
     logger = setup_logging("visualization")
@@ -41,6 +47,11 @@ def main():
     logger.info(f"Question-centering: {config.question_centering}")
     logger.info(f"Top-K selected features: {config.top_k}")
 
+    if args.migrate_npy:
+        logger.info("Writing uncompressed .npy copies of role features...")
+        written = migrate_npz_to_npy(config.features_dir)
+        logger.info(f"Wrote {written} .npy files")
+
     build_visualization_bundle(config=config, logger=logger)
     logger.info("Done! Visualization bundle build complete.")
 
@@ -11,23 +11,39 @@ Usage:
 from __future__ import annotations
 
 import argparse
+import gzip
+import http.client
+import itertools
 import json
-import re
+import string
+import threading
 import time
+from collections.abc import Iterator
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Any
 from urllib.error import HTTPError, URLError
-from urllib.parse import quote
-from urllib.request import Request, urlopen
+from urllib.parse import quote, urljoin, urlsplit
+
+import orjson
 
 from interpret_personas.utils import setup_logging
 
 API_ROOT = "https://neuronpedia.org/api/feature"
 PUBLIC_ROOT = "https://neuronpedia.org"
 DEFAULT_NEURONPEDIA_ID = "gemma-3-27b-it/40-gemmascope-2-res-65k"
-NEURONPEDIA_ID_PATTERN = re.compile(r"^[A-Za-z0-9._/-]+$")
+NEURONPEDIA_ID_CHARS = frozenset(string.ascii_letters + string.digits + "._/-")
 RETRIABLE_HTTP_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+REDIRECT_HTTP_CODES = {301, 302, 303, 307, 308}
+MAX_REDIRECTS = 5
+MAX_RETRY_AFTER_SECONDS = 60.0
+REQUEST_HEADERS = {
+    "Accept": "application/json",
+    "User-Agent": "interpret-personas-neuronpedia-cache/0.1",
+}
+
+# Per-thread {(scheme, netloc): connection} pool, see _pooled_connection
+_CONNECTIONS = threading.local()
 
 
 def _normalize_text(value: object, max_chars: int = 4000) -> str | None:
@@ -57,7 +73,7 @@ def _validate_neuronpedia_id(neuronpedia_id: str) -> None:
     """Validate that neuronpedia_id is path-safe before URL construction."""
     if not neuronpedia_id:
         raise ValueError("neuronpedia_id cannot be empty")
-    if not NEURONPEDIA_ID_PATTERN.fullmatch(neuronpedia_id):
+    if not NEURONPEDIA_ID_CHARS.issuperset(neuronpedia_id):
         raise ValueError(
             "neuronpedia_id contains invalid characters. "
             "Allowed: letters, digits, '.', '_', '-', '/'."
@@ -96,19 +112,61 @@ def _extract_description(payload: object) -> str | None:
     return _normalize_text(payload.get("description"))
 
 
+def _pooled_connection(
+    scheme: str, netloc: str, timeout_seconds: float
+) -> http.client.HTTPConnection:
+    """Return this thread's keep-alive connection to scheme://netloc, creating it on first use."""
+    pool = getattr(_CONNECTIONS, "pool", None)
+    if pool is None:
+        pool = _CONNECTIONS.pool = {}
+    conn = pool.get((scheme, netloc))
+    if conn is None:
+        conn_cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        conn = pool[(scheme, netloc)] = conn_cls(netloc, timeout=timeout_seconds)
+    return conn
+
+
 def _http_get_json(url: str, timeout_seconds: float) -> Any:
-    """GET JSON from URL with a conservative User-Agent."""
-    req = Request(
-        url,
-        headers={
-            "Accept": "application/json",
-            "User-Agent": "interpret-personas-neuronpedia-cache/0.1",
-        },
-        method="GET",
-    )
-    with urlopen(req, timeout=timeout_seconds) as response:
-        body = response.read()
-    return json.loads(body.decode("utf-8"))
+    """GET JSON from URL with a conservative User-Agent.
+
+    Each worker thread reuses one HTTP/1.1 keep-alive connection per host, so only
+    the first request pays the TCP + TLS handshake. Raises HTTPError/URLError like
+    urlopen, so the retry handling in _fetch_one_feature is unchanged.
+    """
+    for _ in range(MAX_REDIRECTS + 1):
+        parts = urlsplit(url)
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        conn = _pooled_connection(parts.scheme, parts.netloc, timeout_seconds)
+        reused = conn.sock is not None
+        try:
+            conn.request("GET", target, headers=REQUEST_HEADERS)
+            response = conn.getresponse()
+            body = response.read()
+        except (http.client.HTTPException, OSError) as err:
+            conn.close()
+            if reused:
+                # The server dropped the idle keep-alive socket; retry on a fresh one
+                continue
+            raise URLError(err) from err
+
+        location = response.getheader("Location")
+        if response.status in REDIRECT_HTTP_CODES and location:
+            url = urljoin(url, location)
+            continue
+        if response.status >= 400:
+            raise HTTPError(url, response.status, response.reason, response.headers, None)
+        return json.loads(body.decode("utf-8"))
+
+    raise URLError(f"Too many redirects or dropped connections for {url}")
+
+
+def _retry_after_seconds(headers) -> float | None:
+    """Parse a numeric Retry-After header (as sent with 429/503), if present."""
+    value = headers.get("Retry-After") if headers is not None else None
+    try:
+        return max(float(value), 0.0) if value is not None else None
+    except ValueError:
+        return None
 
 
 def _fetch_one_feature(
@@ -126,6 +184,7 @@ def _fetch_one_feature(
     url = _api_url(neuronpedia_id, feature_id)
 
     for attempt in range(retries + 1):
+        retry_after = None
         try:
             payload = _http_get_json(url, timeout_seconds)
             description = _extract_description(payload)
@@ -135,6 +194,7 @@ def _fetch_one_feature(
                 # Cache negative result to avoid repeated misses.
                 return feature_id, True, None, None
             retriable = err.code in RETRIABLE_HTTP_CODES
+            retry_after = _retry_after_seconds(err.headers)
             error_message = f"HTTPError {err.code}"
         except (URLError, TimeoutError, json.JSONDecodeError, UnicodeDecodeError) as err:
             retriable = True
@@ -144,17 +204,73 @@ def _fetch_one_feature(
             error_message = f"{type(err).__name__}: {err}"
 
         if attempt < retries and retriable:
-            time.sleep(retry_backoff_seconds * (2 ** attempt))
+            backoff = retry_backoff_seconds * (2 ** attempt)
+            # Honor the server's rate-limit hint so many workers back off together
+            time.sleep(max(backoff, min(retry_after or 0.0, MAX_RETRY_AFTER_SECONDS)))
             continue
         return feature_id, False, None, error_message
 
     return feature_id, False, None, "Unknown fetch failure"
 
 
+def _iter_export_records(export_file: Path) -> Iterator[dict]:
+    """Yield records from a JSON array or JSON Lines file, optionally gzip-compressed."""
+    opener = gzip.open if export_file.suffix == ".gz" else open
+    with opener(export_file, "rt", encoding="utf-8") as f:
+        head = f.read(1)
+        while head.isspace():
+            head = f.read(1)
+        if head == "[":
+            records = json.loads(head + f.read())
+        else:
+            lines = itertools.chain([head + f.readline()], f)
+            records = (json.loads(line) for line in lines if line.strip())
+        for record in records:
+            if isinstance(record, dict):
+                yield record
+
+
+def _load_bulk_explanations(
+    export_file: Path,
+    neuronpedia_id: str,
+    feature_ids: set[int],
+) -> dict[int, str]:
+    """Collect descriptions for feature_ids from a Neuronpedia explanations export.
+
+    Records need a feature index ("index" or "feature_id") and a "description".
+    Records that carry "modelId" and "layer" must match neuronpedia_id. The first
+    usable description per feature wins, as in _extract_description.
+
+    Returns:
+        {feature_id: description} for the requested IDs found in the export
+    """
+    descriptions: dict[int, str] = {}
+    for record in _iter_export_records(export_file):
+        feature_id = _coerce_feature_id(record.get("index", record.get("feature_id")))
+        if feature_id is None or feature_id not in feature_ids or feature_id in descriptions:
+            continue
+        model_id, layer = record.get("modelId"), record.get("layer")
+        if model_id is not None and layer is not None and f"{model_id}/{layer}" != neuronpedia_id:
+            continue
+        description = _normalize_text(record.get("description"))
+        if description:
+            descriptions[feature_id] = description
+    return descriptions
+
+
+def _read_json(path: Path) -> Any:
+    """Parse a JSON file with orjson."""
+    return orjson.loads(path.read_bytes())
+
+
+def _json_line(record: dict[str, Any]) -> bytes:
+    """Serialize one JSON Lines record (UTF-8, newline-terminated) with orjson."""
+    return orjson.dumps(record) + b"\n"
+
+
 def _load_feature_ids(bundle_file: Path) -> list[int]:
     """Read selected feature IDs from bundle JSON."""
-    with open(bundle_file, "r") as f:
-        payload = json.load(f)
+    payload = _read_json(bundle_file)
 
     feature_ids = payload.get("feature_ids")
     if not isinstance(feature_ids, list):
@@ -183,8 +299,7 @@ def _load_existing_cache(cache_file: Path, logger) -> dict[int, dict[str, str |
     if not cache_file.exists():
         return {}
 
-    with open(cache_file, "r") as f:
-        payload = json.load(f)
+    payload = _read_json(cache_file)
 
     cache: dict[int, dict[str, str | None]] = {}
     invalid_rows = 0
@@ -228,6 +343,49 @@ def _load_existing_cache(cache_file: Path, logger) -> dict[int, dict[str, str |
     return cache
 
 
+def _journal_path(cache_file: Path) -> Path:
+    """Append-only journal of fetches not yet compacted into cache_file."""
+    return cache_file.with_suffix(".journal.jsonl")
+
+
+def _replay_journal(journal_file: Path, cache: dict[int, dict[str, str | None]], logger) -> int:
+    """Fold journal entries into cache in file order (last write wins).
+
+    A torn final line from an interrupted run is ignored.
+
+    Returns:
+        Number of entries applied
+    """
+    if not journal_file.exists():
+        return 0
+
+    applied = 0
+    with open(journal_file, "rb") as f:
+        for line in f:
+            try:
+                entry = orjson.loads(line)
+            except orjson.JSONDecodeError:  # Includes a line torn mid-UTF-8
+                logger.warning("Ignoring unreadable journal line in %s", journal_file)
+                continue
+            if not isinstance(entry, dict):
+                continue
+            feature_id = _coerce_feature_id(entry.get("feature_id"))
+            if feature_id is None:
+                continue
+            cache[feature_id] = {
+                "description": _normalize_text(entry.get("description")),
+                "url": _normalize_text(entry.get("url")),
+            }
+            applied += 1
+    return applied
+
+
+def _compact_cache(cache_file: Path, cache: dict[int, dict[str, str | None]]) -> None:
+    """Write the full cache JSON, then drop the journal it now contains."""
+    _write_cache_atomic(cache_file, cache)
+    _journal_path(cache_file).unlink(missing_ok=True)
+
+
 def _write_cache_atomic(cache_file: Path, cache: dict[int, dict[str, str | None]]) -> None:
     """Atomically write cache to disk using JSON dict keyed by feature ID."""
     cache_file.parent.mkdir(parents=True, exist_ok=True)
@@ -274,8 +432,11 @@ def main() -> None:
     parser.add_argument(
         "--max-workers",
         type=int,
-        default=6,
-        help="Concurrent worker threads (default: 6)",
+        default=16,
+        help=(
+            "Concurrent worker threads; they only block on network I/O, and 429 "
+            "responses are retried after Retry-After (default: 16)"
+        ),
     )
     parser.add_argument(
         "--timeout-seconds",
@@ -299,7 +460,7 @@ def main() -> None:
         "--save-every",
         type=int,
         default=100,
-        help="Persist cache every N processed features (default: 100)",
+        help="Flush the fetch journal to disk every N processed features (default: 100)",
     )
     parser.add_argument(
         "--limit",
@@ -307,6 +468,15 @@ def main() -> None:
         default=None,
         help="Optional cap on number of IDs to fetch (debug/smoke runs)",
     )
+    parser.add_argument(
+        "--bulk-explanations",
+        type=Path,
+        default=None,
+        help=(
+            "Optional Neuronpedia explanations export (.json/.jsonl, optionally .gz); "
+            "features found there skip the per-feature API request"
+        ),
+    )
     parser.add_argument(
         "--refresh",
         action="store_true",
@@ -335,6 +505,8 @@ def main() -> None:
         raise ValueError(f"save_every must be > 0, got {args.save_every}")
     if args.limit is not None and args.limit <= 0:
         raise ValueError(f"limit must be > 0 when provided, got {args.limit}")
+    if args.bulk_explanations is not None and not args.bulk_explanations.is_file():
+        raise ValueError(f"bulk_explanations is not a file: {args.bulk_explanations}")
 
     _validate_neuronpedia_id(args.neuronpedia_id)
 
@@ -342,6 +514,10 @@ def main() -> None:
     logger.info("Feature IDs in bundle: %d", len(feature_ids))
 
     existing_cache = _load_existing_cache(args.output_cache, logger)
+    journal_file = _journal_path(args.output_cache)
+    replayed = _replay_journal(journal_file, existing_cache, logger)
+    if replayed:
+        logger.info("Recovered %d entries from %s", replayed, journal_file)
     logger.info("Existing cache entries: %d", len(existing_cache))
 
     if args.refresh:
@@ -349,20 +525,42 @@ def main() -> None:
     else:
         pending_ids = [feature_id for feature_id in feature_ids if feature_id not in existing_cache]
 
+    if args.bulk_explanations is not None and pending_ids:
+        bulk = _load_bulk_explanations(
+            args.bulk_explanations, args.neuronpedia_id, set(pending_ids)
+        )
+        for feature_id, description in bulk.items():
+            existing_cache[feature_id] = {
+                "description": description,
+                "url": _public_url(args.neuronpedia_id, feature_id),
+            }
+        pending_ids = [feature_id for feature_id in pending_ids if feature_id not in bulk]
+        logger.info(
+            "Filled %d entries from %s; %d left to fetch",
+            len(bulk),
+            args.bulk_explanations,
+            len(pending_ids),
+        )
+
     if args.limit is not None:
         pending_ids = pending_ids[: args.limit]
 
     logger.info("Feature IDs to fetch: %d", len(pending_ids))
     if not pending_ids:
         logger.info("Nothing to fetch. Cache is already up to date.")
-        _write_cache_atomic(args.output_cache, existing_cache)
+        _compact_cache(args.output_cache, existing_cache)
         return
 
     completed = 0
     successes = 0
     failures = 0
+    # Each result is appended to the journal (O(1) per fetch) instead of rewriting
+    # the whole cache; the journal is replayed on restart and compacted at the end
+    journal_file.parent.mkdir(parents=True, exist_ok=True)
 
-    with ThreadPoolExecutor(max_workers=args.max_workers) as pool:
+    with open(journal_file, "ab") as journal, ThreadPoolExecutor(
+        max_workers=args.max_workers
+    ) as pool:
         futures = {
             pool.submit(
                 _fetch_one_feature,
@@ -385,10 +583,12 @@ def main() -> None:
                 continue
 
             if ok:
-                existing_cache[feature_id] = {
+                entry = {
                     "description": description,
                     "url": _public_url(args.neuronpedia_id, feature_id),
                 }
+                existing_cache[feature_id] = entry
+                journal.write(_json_line({"feature_id": feature_id, **entry}))
                 successes += 1
             else:
                 failures += 1
@@ -399,7 +599,7 @@ def main() -> None:
                 )
 
             if completed % args.save_every == 0:
-                _write_cache_atomic(args.output_cache, existing_cache)
+                journal.flush()
                 logger.info(
                     "Progress: %d/%d processed (success=%d, failure=%d)",
                     completed,
@@ -408,7 +608,7 @@ def main() -> None:
                     failures,
                 )
 
-    _write_cache_atomic(args.output_cache, existing_cache)
+    _compact_cache(args.output_cache, existing_cache)
     logger.info(
         "Done. Processed=%d, success=%d, failure=%d, total cache entries=%d",
         completed,